@@ -0,0 +1,103 @@
+# Accuracy report for the closed-form elliptic integrals in elliptical.py.
+#
+#     python benchmarks/elliptic_accuracy.py
+#
+# The new K/E are compared against an independent arithmetic-geometric mean
+# (AGM) evaluation and against the 1000 point Simpson quadrature that
+# elliptical.py used before.  The old quadrature integrated
+# 1 / sqrt(1 - k^2 sin(phi)) instead of 1 / sqrt(1 - k^2 sin^2(phi)), so it is
+# also reported with the integrand corrected to separate the quadrature error
+# from the integrand error.  Finally, the on-axis and off-axis field of a
+# single loop is checked against a direct Biot-Savart integration.
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import numpy
+from scipy import integrate
+
+from elliptical import K, E
+from coil import CircularCoil
+
+
+simpson = getattr(integrate, "simps", None) or integrate.simpson
+
+
+def legacy_K(kto2, power=1, points=1000):
+    phi = numpy.linspace(0, 0.5 * numpy.pi, points)
+    return simpson(1.0 / numpy.sqrt(1 - numpy.multiply.outer(kto2, numpy.sin(phi)**power)), x=phi, axis=-1)
+
+
+def legacy_E(kto2, power=1, points=1000):
+    phi = numpy.linspace(0, 0.5 * numpy.pi, points)
+    return simpson(numpy.sqrt(1 - numpy.multiply.outer(kto2, numpy.sin(phi)**power)), x=phi, axis=-1)
+
+
+def agm_K_E(kto2, tol=1e-16):
+    # Abramowitz & Stegun 17.6: K = pi / (2 AGM(1, k')), E = K (1 - sum 2^(n-1) c_n^2)
+    a = numpy.ones_like(kto2)
+    b = numpy.sqrt(1.0 - kto2)
+    c = numpy.sqrt(kto2)
+    total = 0.5 * c**2
+    power = 0.5
+    while numpy.max(numpy.abs(c)) > tol:
+        a, b, c = 0.5 * (a + b), numpy.sqrt(a * b), 0.5 * (a - b)
+        power *= 2.0
+        total += power * c**2
+    k = numpy.pi / (2.0 * a)
+    return k, k * (1.0 - total)
+
+
+def relative(a, b):
+    return numpy.abs(a - b) / numpy.abs(b)
+
+
+def biot_savart(coil, rho, z, points=200000):
+    # field of the loop at (rho, 0, z), integrating dl x r over the winding
+    phi = numpy.linspace(0, 2 * numpy.pi, points, endpoint=False)
+    dphi = 2 * numpy.pi / points
+    dx = numpy.array([rho - coil.radius * numpy.cos(phi),
+                      - coil.radius * numpy.sin(phi),
+                      numpy.full_like(phi, z - coil.pos_z)])
+    dl = numpy.array([- numpy.sin(phi), numpy.cos(phi), numpy.zeros_like(phi)]) * coil.radius * dphi
+    dB = numpy.cross(dl.T, dx.T) / (numpy.linalg.norm(dx, axis=0)**3)[:, None]
+    Bx, By, Bz = dB.sum(axis=0) * coil.num_turns * coil.I / (4 * numpy.pi)
+    return Bz, Bx
+
+
+def main():
+    kto2 = numpy.concatenate((numpy.linspace(0.0, 0.9, 91), 1.0 - numpy.logspace(-1.05, -12, 60)))
+    K_new, E_new = K(kto2), E(kto2)
+    K_agm, E_agm = agm_K_E(kto2)
+
+    print("Complete elliptic integrals, {} values of k^2 in [0, 1 - 1e-12]".format(len(kto2)))
+    print("")
+    print("\t{:<40}{:>14}{:>14}".format("max. relative difference", "K", "E"))
+    print("\t{:<40}{:>14.3e}{:>14.3e}".format("new vs AGM reference",
+        relative(K_new, K_agm).max(), relative(E_new, E_agm).max()))
+    print("\t{:<40}{:>14.3e}{:>14.3e}".format("old Simpson (sin phi) vs AGM",
+        relative(legacy_K(kto2), K_agm).max(), relative(legacy_E(kto2), E_agm).max()))
+    print("\t{:<40}{:>14.3e}{:>14.3e}".format("Simpson with sin^2 phi vs AGM",
+        relative(legacy_K(kto2, 2), K_agm).max(), relative(legacy_E(kto2, 2), E_agm).max()))
+    print("")
+
+    print("\t{:>10}{:>14}{:>14}{:>14}{:>14}".format("k^2", "K new", "K old", "E new", "E old"))
+    for m in [0.0, 0.1, 0.5, 0.9, 0.99, 0.999999]:
+        print("\t{:>10}{:>14.8f}{:>14.8f}{:>14.8f}{:>14.8f}".format(
+            m, K(m), legacy_K(m), E(m), legacy_E(m)))
+    print("")
+
+    coil = CircularCoil(0.2, 1, 1.0, 0.0)
+    print("Single loop, R = 0.2 m, N I = 1 A, field / mu0 [A/m]")
+    print("")
+    print("\t{:>8}{:>8}{:>16}{:>16}{:>16}{:>16}".format(
+        "rho", "z", "Bz", "Bz Biot-Savart", "Brho", "Brho Biot-Sav."))
+    for rho, z in [(1e-9, 0.0), (1e-9, 0.1), (0.05, 0.05), (0.1, -0.1), (0.15, 0.02), (0.3, 0.2)]:
+        bz, brho = biot_savart(coil, rho, z)
+        print("\t{:>8.3f}{:>8.3f}{:>16.10f}{:>16.10f}{:>16.10f}{:>16.10f}".format(
+            rho, z, coil.Bz(rho, z), bz, coil.Brho(rho, z), brho))
+
+
+if __name__ == "__main__":
+    main()
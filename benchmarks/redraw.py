@@ -0,0 +1,178 @@
+# Redraw time of result plots, against the 50 ms interaction target.
+#
+#     python benchmarks/redraw.py [--sizes 501 1001 2001 4001] [--repeat 5]
+#                                 [--target 0.05] [--legacy 1001]
+#
+# Draws a size x size norm grid the way PlotBox does for uniform grids, on an
+# Agg canvas of the same size (800 x 800 pixels): an image from a GridPyramid
+# level with about one point per pixel of the axes, whose level and window
+# follow the axis limits through xlim_changed/ylim_changed, as toolbar zooms
+# and pans set them. Each interaction is timed as the best of --repeat runs, from the
+# change to the end of the full draw:
+#
+#   zoom      limits set to the central 10% of the grid
+#   pan       the zoomed view moved by half its width
+#   unzoom    back to the whole grid
+#   colormap  set_cmap and set_clim on the image
+#
+# --legacy also times the full-resolution gouraud pcolormesh that
+# update_plot drew on every redraw before, for grids up to that size (it
+# takes seconds above). The exit status is 1 when an interaction misses
+# --target.
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import matplotlib
+matplotlib.use("Agg")
+import numpy
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+import designs
+from fieldcache import CachedSolver, FieldCache
+from functions import MU0
+from pyramid import GridPyramid
+
+
+def norm_grid(points):
+    coils = designs.helmholtz()
+    z_arr = numpy.linspace(-0.5, 0.5, points)
+    y_arr = numpy.linspace(-0.5, 0.5, points)
+    solver = CachedSolver(coils, z_arr, y_arr, MU0, cache=FieldCache())
+    solver.run()
+    return numpy.sqrt(solver.Bz_grid**2 + solver.Brho_grid**2), z_arr, y_arr
+
+
+class View(object):
+    # the image path of PlotBox.build_plot and on_limits_changed
+    def __init__(self, norm, z_arr, y_arr):
+        self.fig = Figure(figsize=(10, 10), dpi=80)
+        self.canvas = FigureCanvasAgg(self.fig)
+        self.ax = self.fig.add_subplot(111)
+        self.pyramid = GridPyramid(norm, z_arr, y_arr)
+        self.relimiting = False
+
+        low, high = numpy.percentile(norm, [1, 99])
+        values, extent = self.image((z_arr[0], z_arr[-1]), (y_arr[0], y_arr[-1]))
+        self.mesh = self.ax.imshow(values.T, origin="lower", extent=extent, interpolation="bilinear",
+            cmap="jet", vmin=low, vmax=high, zorder=-1)
+        self.fig.colorbar(self.mesh, format="%.2E")
+        self.ax.callbacks.connect("xlim_changed", self.on_limits_changed)
+        self.ax.callbacks.connect("ylim_changed", self.on_limits_changed)
+        self.ax.set_xlim(z_arr[0], z_arr[-1])
+        self.ax.set_ylim(y_arr[0], y_arr[-1])
+        self.ax.set_aspect("equal")
+        self.fig.tight_layout()
+        self.canvas.draw()
+
+    def image(self, z_lims, y_lims):
+        width, height = self.ax.bbox.width, self.ax.bbox.height
+        return self.pyramid.image(z_lims, y_lims, width, height)
+
+    def on_limits_changed(self, ax):
+        if self.relimiting:
+            return
+        self.relimiting = True
+        try:
+            values, extent = self.image(ax.get_xlim(), ax.get_ylim())
+            self.mesh.set_data(values.T)
+            self.mesh.set_extent(extent)
+        finally:
+            self.relimiting = False
+
+    def limits(self, z_lims, y_lims):
+        self.ax.set_xlim(z_lims)
+        self.ax.set_ylim(y_lims)
+        self.canvas.draw()
+
+    def colormap(self, name):
+        self.mesh.set_cmap(name)
+        self.mesh.set_clim(*self.mesh.get_clim())
+        self.canvas.draw()
+
+
+def legacy(norm, z_arr, y_arr):
+    fig = Figure(figsize=(10, 10), dpi=80)
+    canvas = FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
+    z_grid, y_grid = [grid.T for grid in numpy.meshgrid(z_arr, y_arr)]
+    mesh = ax.pcolormesh(z_grid, y_grid, norm, shading="gouraud", cmap="jet")
+    fig.colorbar(mesh, format="%.2E")
+    ax.set_aspect("equal")
+    fig.tight_layout()
+    canvas.draw()
+
+
+def best_time(function, repeat):
+    best = None
+    for _ in range(repeat):
+        start = timeit.default_timer()
+        function()
+        elapsed = timeit.default_timer() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the redraws of result plots.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[501, 1001, 2001, 4001])
+    parser.add_argument("--repeat", type=int, default=5, help="runs per interaction, the best one counts")
+    parser.add_argument("--target", type=float, default=0.05, help="time allowed per redraw [s]")
+    parser.add_argument("--legacy", type=int, default=1001, metavar="SIZE",
+        help="time the gouraud pcolormesh for grids up to SIZE (0: never)")
+    args = parser.parse_args()
+
+    print("{:>6} {:>10} {:>10} {:>10} {:>10} {:>10}".format(
+        "size", "zoom [ms]", "pan [ms]", "unzoom", "colormap", "gouraud"))
+    missed = []
+    for points in args.sizes:
+        norm, z_arr, y_arr = norm_grid(points)
+        view = View(norm, z_arr, y_arr)
+        full = (z_arr[0], z_arr[-1])
+        zoom = (-0.05, 0.05)
+        pan = (0.0, 0.1)
+
+        def zoom_in():
+            view.limits(full, full)
+            start = timeit.default_timer()
+            view.limits(zoom, zoom)
+            return timeit.default_timer() - start
+
+        def pan_over():
+            view.limits(zoom, zoom)
+            start = timeit.default_timer()
+            view.limits(pan, zoom)
+            return timeit.default_timer() - start
+
+        def zoom_out():
+            view.limits(zoom, zoom)
+            start = timeit.default_timer()
+            view.limits(full, full)
+            return timeit.default_timer() - start
+
+        times = {
+            "zoom": min(zoom_in() for _ in range(args.repeat)),
+            "pan": min(pan_over() for _ in range(args.repeat)),
+            "unzoom": min(zoom_out() for _ in range(args.repeat)),
+        }
+        names = iter(["viridis", "jet"] * args.repeat)
+        times["colormap"] = best_time(lambda: view.colormap(next(names)), args.repeat)
+        missed += ["{}/{}".format(name, points) for name, seconds in times.items() if seconds > args.target]
+
+        gouraud = ""
+        if points <= args.legacy:
+            gouraud = "{:10.1f}".format(1000 * best_time(lambda: legacy(norm, z_arr, y_arr), 1))
+        print("{:>6} {:10.1f} {:10.1f} {:10.1f} {:10.1f} {:>10}".format(points,
+            1000 * times["zoom"], 1000 * times["pan"], 1000 * times["unzoom"], 1000 * times["colormap"], gouraud))
+
+    if missed:
+        print("Slower than {:.0f} ms: {}".format(1000 * args.target, ", ".join(missed)))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
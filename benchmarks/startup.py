@@ -0,0 +1,108 @@
+# Startup cost of the GUI.
+#
+#     python benchmarks/startup.py [--repeat 5] [--json startup.json]
+#
+# Time to first window is the wall time of `python src/interface.py` with
+# MFV_EXIT_ON_START set, which quits from the first idle callback once the
+# input window is shown (needs GTK and a display). The same run is traced with
+# -X importtime to list the heavy packages (HEAVY) that are loaded before the
+# window appears, which should be none. The import cost of each module in
+# MODULES is its cumulative -X importtime in a fresh interpreter. Every time
+# is the best of --repeat runs; modules that cannot be imported here (e.g.
+# without GTK) are reported as unavailable.
+import argparse
+import datetime
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import timeit
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+MODULES = [
+    "numpy", "scipy.special", "openpyxl", "matplotlib.pyplot",
+    "coil", "functions", "designs", "workbook", "resultfile",
+    "Simulation", "PlotWindow", "HomogeneityWindow", "ZoomWindow", "Results", "interface",
+]
+
+HEAVY = ["matplotlib", "mpl_toolkits", "scipy", "openpyxl"]
+
+IMPORT_LINE = re.compile(r"^import time:\s+\d+ \|\s+(\d+) \|( *)(\S+)$")
+
+
+def imports(stderr):
+    # {module: cumulative seconds} of the top-level imports in -X importtime output
+    times = {}
+    for line in stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            times.setdefault(match.group(3), (int(match.group(1)) * 1e-6, len(match.group(2))))
+    return times
+
+
+def import_cost(module, repeat):
+    best = None
+    for _ in range(repeat):
+        process = subprocess.run([sys.executable, "-X", "importtime", "-c", "import " + module],
+            cwd=SRC, capture_output=True, text=True)
+        if process.returncode != 0:
+            return None
+        cost = imports(process.stderr).get(module, (None,))[0]
+        best = cost if best is None else min(best, cost)
+    return best
+
+
+def first_window(repeat):
+    # (best wall time, heavy packages imported before the window) or (None, None)
+    env = dict(os.environ, MFV_EXIT_ON_START="1")
+    best = None
+    heavy = None
+    for _ in range(repeat):
+        start = timeit.default_timer()
+        process = subprocess.run([sys.executable, "-X", "importtime", "interface.py"],
+            cwd=SRC, env=env, capture_output=True, text=True, timeout=120)
+        elapsed = timeit.default_timer() - start
+        if process.returncode != 0:
+            return None, None
+        best = elapsed if best is None else min(best, elapsed)
+        loaded = imports(process.stderr)
+        heavy = sorted(name for name in loaded if name.split(".")[0] in HEAVY and loaded[name][1] == 0)
+    return best, heavy
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", default=None, metavar="FILE", help="append the results to FILE (JSON lines)")
+    args = parser.parse_args()
+
+    window, heavy = first_window(args.repeat)
+    if window is None:
+        print("time to first window: unavailable (no GTK or no display)")
+    else:
+        print("time to first window: {:.3f} s".format(window))
+        print("heavy imports before the window: {}".format(", ".join(heavy) if heavy else "none"))
+
+    costs = {}
+    print("{:<20} {:>12}".format("module", "import [s]"))
+    for module in MODULES:
+        costs[module] = import_cost(module, args.repeat)
+        print("{:<20} {:>12}".format(module, "unavailable" if costs[module] is None else "{:.3f}".format(costs[module])))
+
+    if args.json:
+        record = {
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "first_window": window,
+            "heavy_at_startup": heavy,
+            "imports": costs,
+        }
+        with open(args.json, "a") as f:
+            f.write(json.dumps(record) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+# Benchmark suite for the physics and I/O hot paths, runnable offline.
+#
+#     python benchmarks/suite.py [--quick] [--repeat 3] [--workers N] [--only grid]
+#                                [--history history.jsonl] [--baseline baseline.json]
+#                                [--save-baseline baseline.json] [--tolerance 0.2]
+#
+# Every case is timed as the best of --repeat runs on fixed inputs (random coil
+# sets use fixed seeds). A run is one JSON record with the machine, the
+# library versions, the git commit and, per case, the time [s] and a rate
+# (points or values per second). --history appends the record to a JSON lines
+# file; --save-baseline writes it as the reference that --baseline compares
+# against, flagging every case slower than the baseline by more than
+# --tolerance (the exit status is 1 when there is any).
+#
+# Cases:
+#   elliptic/K, elliptic/E        elliptical.K/E on 10^6 values of k^2
+#   coil/Bz, coil/Brho            CircularCoil.Bz/Brho on 10^6 points
+#   grid/<design>/<points>        the Simulation engine (CachedSolver, cold
+#                                 cache) on points x points grids, for the
+#                                 presets and random sets of N coils
+#   max_square/<points>           what HomogeneityWindow.compute_max_square
+#                                 does: uniformity index, bound and bisection
+#   xlsx/export, xlsx/import      workbook.write_results/read_results
+#   mfv/export, mfv/import        resultfile.write_results_file/read_results_file
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import timeit
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+import numpy
+import scipy
+import openpyxl
+
+import designs
+from elliptical import K, E
+from coil import CircularCoil
+from fieldcache import CachedSolver, FieldCache
+from functions import MU0, electrical_parameters, max_homogeneous_square
+from homogeneity import UniformityIndex
+from resultfile import read_results_file, write_results_file
+from workbook import read_results, write_results
+
+AWG = os.path.join(ROOT, "src", "resources", "awg.dat")
+
+PRESETS = ["helmholtz", "maxwell", "wang", "tetracoil", "lee_whiting"]
+
+
+def best_time(function, repeat):
+    best = None
+    for _ in range(repeat):
+        start = timeit.default_timer()
+        function()
+        elapsed = timeit.default_timer() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def design_coils(name):
+    # a preset, or "random<N>" for N random coils (seed 0)
+    if name.startswith("random"):
+        return designs.random_coils(int(name[len("random"):]), seed=0)
+    return designs.DESIGNS[name]()
+
+
+def axes(coils, points):
+    extent = 1.5 * max(max(coil.radius for coil in coils), max(abs(coil.pos_z) for coil in coils))
+    return numpy.linspace(-extent, extent, points), numpy.linspace(-extent, extent, points)
+
+
+def solve(coils, z_arr, y_arr, workers):
+    solver = CachedSolver(coils, z_arr, y_arr, MU0, workers, cache=FieldCache())
+    solver.run()
+    return solver
+
+
+def cases(quick, workers):
+    # (name, function to time, work per call, unit of the rate)
+    rng = numpy.random.RandomState(0)
+    kto2 = rng.uniform(0.0, 0.999, 10**6)
+    rho = rng.uniform(1e-3, 1.0, 10**6)
+    z = rng.uniform(-1.0, 1.0, 10**6)
+    coil = CircularCoil(0.5, 100, 1.0, 0.1)
+
+    yield "elliptic/K", lambda: K(kto2), kto2.size, "values/s"
+    yield "elliptic/E", lambda: E(kto2), kto2.size, "values/s"
+    yield "coil/Bz", lambda: coil.Bz(rho, z), rho.size, "points/s"
+    yield "coil/Brho", lambda: coil.Brho(rho, z), rho.size, "points/s"
+
+    sizes = [101, 201] if quick else [101, 201, 401, 801]
+    for name in PRESETS:
+        coils = design_coils(name)
+        for points in sizes:
+            z_arr, y_arr = axes(coils, points)
+            yield ("grid/{}/{}".format(name, points),
+                lambda coils=coils, z_arr=z_arr, y_arr=y_arr: solve(coils, z_arr, y_arr, workers),
+                points**2, "points/s")
+
+    # past the cache budget the solver sums coils directly, so large sets
+    # are bound by the field evaluation rather than by memory
+    runs = [(10, 101), (100, 101), (1000, 101)]
+    if not quick:
+        runs += [(2000, 201), (5000, 101), (5000, 201)]
+    for count, points in runs:
+        coils = design_coils("random{}".format(count))
+        z_arr, y_arr = axes(coils, points)
+        yield ("grid/random{}/{}".format(count, points),
+            lambda coils=coils, z_arr=z_arr, y_arr=y_arr: solve(coils, z_arr, y_arr, workers),
+            points**2, "points/s")
+
+    points = 201 if quick else 401
+    coils = design_coils("helmholtz")
+    z_arr, y_arr = axes(coils, points)
+    solver = solve(coils, z_arr, y_arr, workers)
+    norm = numpy.sqrt(solver.Bz_grid**2 + solver.Brho_grid**2)
+
+    def max_square():
+        index = UniformityIndex(coils, norm, MU0, (0.0, 0.0), z_arr, y_arr)
+        high = min(abs(z_arr[-1]), index.square_bound(0.99) or abs(z_arr[-1]))
+        return max_homogeneous_square(coils, MU0, (0.0, 0.0), 0.99, high, norm_mid=index.norm_mid)
+
+    yield "max_square/{}".format(points), max_square, points**2, "points/s"
+
+    points = 101 if quick else 201
+    z_arr, y_arr = axes(coils, points)
+    solver = solve(coils, z_arr, y_arr, workers)
+    norm = numpy.sqrt(solver.Bz_grid**2 + solver.Brho_grid**2)
+    grid = {"z_min": z_arr[0], "z_max": z_arr[-1], "z_points": points - 1,
+            "y_min": y_arr[0], "y_max": y_arr[-1], "y_points": points - 1}
+    values = (coils, grid, z_arr, y_arr, solver.Bz_grid, solver.Brho_grid, norm,
+              electrical_parameters(coils, AWG))
+    directory = tempfile.mkdtemp()
+    xlsx = os.path.join(directory, "results.xlsx")
+    mfv = os.path.join(directory, "results.mfv")
+
+    yield "xlsx/export", lambda: write_results(xlsx, *values), 3 * points**2, "values/s"
+    yield "xlsx/import", lambda: read_results(xlsx), 3 * points**2, "values/s"
+    yield "mfv/export", lambda: write_results_file(mfv, *values), 3 * points**2, "values/s"
+    yield "mfv/import", lambda: [numpy.sum(a) for a in read_results_file(mfv).values()
+                                 if isinstance(a, numpy.ndarray)], 3 * points**2, "values/s"
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+            capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def machine():
+    return {
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+        "python": platform.python_version(),
+        "numpy": numpy.__version__,
+        "scipy": scipy.__version__,
+        "openpyxl": openpyxl.__version__,
+    }
+
+
+def compare(record, baseline, tolerance):
+    # names of the cases slower than the baseline by more than tolerance
+    slower = []
+    for name, result in record["cases"].items():
+        reference = baseline["cases"].get(name)
+        if reference and result["seconds"] > reference["seconds"] * (1 + tolerance):
+            slower.append(name)
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the physics and I/O hot paths.")
+    parser.add_argument("--quick", action="store_true", help="smaller grids and coil sets")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case, the best one counts")
+    parser.add_argument("--workers", type=int, default=None, help="solver threads (default: all cores)")
+    parser.add_argument("--only", default=None, metavar="PREFIX", help="only the cases starting with PREFIX")
+    parser.add_argument("--history", default=None, metavar="FILE", help="append the run to FILE (JSON lines)")
+    parser.add_argument("--baseline", default=None, metavar="FILE", help="flag regressions against FILE")
+    parser.add_argument("--save-baseline", default=None, metavar="FILE", help="write the run as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    record = {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "machine": machine(),
+        "quick": args.quick,
+        "repeat": args.repeat,
+        "workers": args.workers,
+        "cases": {},
+    }
+
+    print("{:<28} {:>10} {:>16} {:>10}".format("case", "time [s]", "rate", "baseline"))
+    for name, function, work, unit in cases(args.quick, args.workers):
+        if args.only and not name.startswith(args.only):
+            continue
+        seconds = best_time(function, args.repeat)
+        record["cases"][name] = {"seconds": seconds, "rate": work / seconds, "unit": unit}
+
+        change = ""
+        if baseline and name in baseline["cases"]:
+            change = "{:+.1%}".format(seconds / baseline["cases"][name]["seconds"] - 1)
+        print("{:<28} {:10.4f} {:>16} {:>10}".format(name, seconds,
+            "{:.3E} {}".format(work / seconds, unit.split("/")[0]), change))
+
+    if args.history:
+        with open(args.history, "a") as f:
+            f.write(json.dumps(record) + "\n")
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(record, f, indent=1)
+
+    if baseline:
+        if baseline["machine"] != record["machine"]:
+            print("warning: the baseline was recorded on another machine or library versions")
+        slower = compare(record, baseline, args.tolerance)
+        if slower:
+            print("Regressions (more than {:.0%} slower than {}):".format(args.tolerance, args.baseline))
+            for name in slower:
+                print("  " + name)
+            sys.exit(1)
+        print("No regressions against {}".format(args.baseline))
+
+
+if __name__ == "__main__":
+    main()
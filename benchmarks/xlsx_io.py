@@ -0,0 +1,139 @@
+# Speed of the results workbook export and import.
+#
+#     python benchmarks/xlsx_io.py [--size 300] [--memory]
+#
+# The streaming writer and reader in workbook.py (write-only rows, read-only
+# iter_rows into preallocated arrays) are compared against the cell by cell
+# loops that Results.on_export and the "Load results" dialogs used before, on
+# a size x size grid. With --memory every step runs again under tracemalloc,
+# which slows it down several times, to report its peak allocation.
+import argparse
+import os
+import sys
+import tempfile
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import numpy
+import openpyxl
+
+from coil import CircularCoil
+from workbook import ELECTRICAL_ROWS, read_results, write_results
+
+
+def legacy_write(filename, coils, grid, z_arr, y_arr, Bz_grid, Brho_grid, norm, electrical_values):
+    wb = openpyxl.Workbook()
+    wb.remove(wb.active)
+    wInput = wb.create_sheet('Simulation parameters')
+    wCoils = wb.create_sheet('Input parameters')
+    wElectrical = wb.create_sheet('Electrical parameters')
+    wBy = wb.create_sheet('B y')
+    wBz = wb.create_sheet('B z')
+    wBnorm = wb.create_sheet('B norm')
+    title_style = openpyxl.styles.Font(bold=True)
+
+    for i, key in enumerate(("z_min", "z_max", "z_points", "y_min", "y_max", "y_points")):
+        wInput.cell(row=1 + i, column=1 + 0).value = key
+        wInput.cell(row=1 + i, column=1 + 0).font = title_style
+        wInput.cell(row=1 + i, column=1 + 1).value = grid[key]
+    for i, coil in enumerate(coils):
+        wCoils.cell(row=1 + i + 1, column=1 + 0).value = coil.radius
+        wCoils.cell(row=1 + i + 1, column=1 + 1).value = coil.num_turns
+        wCoils.cell(row=1 + i + 1, column=1 + 2).value = coil.I
+        wCoils.cell(row=1 + i + 1, column=1 + 3).value = coil.pos_z
+    for i, label in enumerate(ELECTRICAL_ROWS):
+        wElectrical.cell(row=1 + i, column=1 + 0).value = label
+        wElectrical.cell(row=1 + i, column=1 + 1).value = electrical_values[label]
+
+    for sheet in (wBz, wBy, wBnorm):
+        for i, val in enumerate(z_arr):
+            sheet.cell(row=1 + 0, column=1 + i + 1).value = val
+            sheet.cell(row=1 + 0, column=1 + i + 1).font = title_style
+        for i, val in enumerate(y_arr):
+            sheet.cell(row=1 + i + 1, column=1 + 0).value = val
+            sheet.cell(row=1 + i + 1, column=1 + 0).font = title_style
+    for i, _ in enumerate(z_arr):
+        for j, _ in enumerate(y_arr):
+            wBz.cell(row=1 + j + 1, column=1 + i + 1).value = Bz_grid[i, j]
+            wBy.cell(row=1 + j + 1, column=1 + i + 1).value = Brho_grid[i, j]
+            wBnorm.cell(row=1 + j + 1, column=1 + i + 1).value = norm[i, j]
+    wb.save(filename)
+
+
+def legacy_read(filename):
+    wb = openpyxl.load_workbook(filename)
+    wBy = wb['B y']
+    wBz = wb['B z']
+    wBnorm = wb['B norm']
+
+    z_arr = []
+    for i in range(wBz.max_column - 1):
+        z_arr.append(wBz.cell(row=1 + 0, column=1 + i + 1).value)
+    y_arr = []
+    for i in range(wBz.max_row - 1):
+        y_arr.append(wBz.cell(row=1 + i + 1, column=1 + 0).value)
+
+    Bz_grid = numpy.zeros(shape=(len(z_arr), len(y_arr)))
+    Brho_grid = numpy.zeros(shape=(len(z_arr), len(y_arr)))
+    norm = numpy.zeros(shape=(len(z_arr), len(y_arr)))
+    for i in range(len(z_arr) - 1):
+        for j in range(len(y_arr) - 1):
+            Bz_grid[i, j] = wBz.cell(row=1 + j + 1, column=1 + i + 1).value
+            Brho_grid[i, j] = wBy.cell(row=1 + j + 1, column=1 + i + 1).value
+            norm[i, j] = wBnorm.cell(row=1 + j + 1, column=1 + i + 1).value
+    return z_arr, y_arr, Bz_grid, Brho_grid, norm
+
+
+def measure(memory, function, *args):
+    # (time [s], peak memory [MB] or nan)
+    start = timeit.default_timer()
+    function(*args)
+    elapsed = timeit.default_timer() - start
+    if not memory:
+        return elapsed, numpy.nan
+    tracemalloc.start()
+    function(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=300, help="grid points along z and y")
+    parser.add_argument("--memory", action="store_true", help="also report the peak memory of each step")
+    args = parser.parse_args()
+
+    n = args.size
+    coils = [CircularCoil(0.5, 100, 1.0, -0.25), CircularCoil(0.5, 100, 1.0, 0.25)]
+    grid = {"z_min": -1.0, "z_max": 1.0, "z_points": n - 1, "y_min": -1.0, "y_max": 1.0, "y_points": n - 1}
+    z_arr = numpy.linspace(-1, 1, n)
+    y_arr = numpy.linspace(-1, 1, n)
+    rng = numpy.random.RandomState(0)
+    Bz_grid, Brho_grid = rng.uniform(-1, 1, (2, n, n))
+    norm = numpy.sqrt(Bz_grid**2 + Brho_grid**2)
+    electrical_values = {label: 1.0 for label in ELECTRICAL_ROWS}
+    values = (coils, grid, z_arr, y_arr, Bz_grid, Brho_grid, norm, electrical_values)
+
+    directory = tempfile.mkdtemp()
+    legacy_file = os.path.join(directory, "legacy.xlsx")
+    streamed_file = os.path.join(directory, "streamed.xlsx")
+
+    print("{0} x {0} grid".format(n))
+    print("{:<8} {:>14} {:>14} {:>14} {:>14}".format("", "legacy [s]", "streamed [s]", "legacy [MB]", "streamed [MB]"))
+    old = measure(args.memory, legacy_write, legacy_file, *values)
+    new = measure(args.memory, write_results, streamed_file, *values)
+    print("{:<8} {:14.3f} {:14.3f} {:14.1f} {:14.1f}".format("export", old[0], new[0], old[1], new[1]))
+    old = measure(args.memory, legacy_read, legacy_file)
+    new = measure(args.memory, read_results, streamed_file)
+    print("{:<8} {:14.3f} {:14.3f} {:14.1f} {:14.1f}".format("import", old[0], new[0], old[1], new[1]))
+
+    data = read_results(streamed_file)
+    print("max. relative round trip error = {:.1E}".format(
+        numpy.max(numpy.abs(data["norm"] - norm) / norm)))
+
+
+if __name__ == "__main__":
+    main()
@@ -26,15 +26,24 @@ from matplotlib.backends.backend_gtk3agg import FigureCanvasGTK3Agg as FigureCan
 from matplotlib.backends.backend_gtk3 import NavigationToolbar2GTK3 as NavigationToolbar
 
 from PlotWindow import PlotBox
-from functions import uniformity, compute_norm
+from functions import compute_norm, max_homogeneous_square
+from homogeneity import UniformityIndex
+from profiling import profiler
+from harmonics import ZonalExpansion
 from About import AboutWindow
 from ErrorMessage import ErrorMessage
 import numpy
 
+# uniformity levels written by "Export contours", along with the current one
+CONTOUR_LEVELS = [0.90, 0.95, 0.99, 0.999]
+
 class HomogeneityWindow():
-    def __init__(self, parent, simulation, colormap, zoom_value=0, homogeneity=0.0):
+    def __init__(self, parent, simulation, colormap, zoom_value=0, homogeneity=0.0, square_samples=None):
         self.zoom = 100.0
         self.homo = 97.0
+        # boundary points per side of the homogeneous square, by default
+        # spaced no wider than the grid
+        self.square_samples = square_samples or max(20, simulation.z_points, simulation.y_points)
 
         self.parent = parent
         self.simulation = simulation
@@ -54,6 +63,7 @@ class HomogeneityWindow():
         self.boxPlot = self.builder.get_object("boxPlot")
         self.menuColorMap = self.builder.get_object("menuColorMap")
         self.btnQuit = self.builder.get_object("btnQuit")
+        self.btnExportContours = self.builder.get_object("btnExportContours")
         self.btnAbout = self.builder.get_object("btnAbout")
         self.txtExperimentationVolume = self.builder.get_object("txtExperimentationVolume")
 
@@ -67,6 +77,7 @@ class HomogeneityWindow():
         self.btnApplyZoom.connect("clicked", self.on_apply_zoom)
         self.btnApplyHomo.connect("clicked", self.on_apply_homo)
         self.btnQuit.connect("activate", lambda _: self.window.close())
+        self.btnExportContours.connect("activate", self.on_export_contours)
         self.btnAbout.connect("activate", lambda _: AboutWindow(self.window))
 
         self.plot = PlotBox(self, self.simulation, self.colormap, self.statBar, binary_colors=True)
@@ -133,7 +144,7 @@ class HomogeneityWindow():
             return False
 
     def on_apply_zoom(self, widget):
-        self.plot.rect = None
+        self.plot.clear_rectangle()
         value = self.txtZoomValue.get_text().replace("%", "")
         self.zoom = float(value) if self.isNumeric(value) else False
 
@@ -151,7 +162,7 @@ class HomogeneityWindow():
 
 
     def on_apply_homo(self, widget):
-        self.plot.rect = None
+        self.plot.clear_rectangle()
         value = self.txtHomoValue.get_text().replace("%", "")
         self.homo = float(value) if self.isNumeric(value) else False
 
@@ -169,14 +180,14 @@ class HomogeneityWindow():
             ErrorMessage(self.window, "Invalid input parameters", "Zoom value must be a positive real.")
             return
 
-        center, uniformity_grid = self.compute_uniformity()
-        homo_grid = numpy.where(uniformity_grid >= (self.homo / 100), 1, 0)
+        center, index = self.compute_uniformity()
+        homo_grid = index.mask(self.homo / 100).astype(int)
 
 
-        self.plot.initial_norm = homo_grid.copy()
+        self.plot.initial_norm = homo_grid
         zmin, zmax, ymin, ymax = self.plot.compute_zoom(self.zoom)
 
-        self.mid = self.compute_max_square(center)
+        self.mid = self.compute_max_square(center, index)
         self.plot_rectangle_homo()
 
         self.parent.plot.draw_rectangle(zmin, zmax, ymin, ymax)
@@ -187,51 +198,71 @@ class HomogeneityWindow():
 
         self.write_experimentation_values()
 
+        if profiler.enabled:
+            self.statBar.push(2, "Profile: " + profiler.summary(["homogeneity", "plot"], self.simulation.profile_start))
+
 
 
     def compute_uniformity(self):
         zmid = (self.simulation.z_max + self.simulation.z_min) * 0.5
         ymid = (self.simulation.y_max + self.simulation.y_min) * 0.5
         center = (zmid, ymid)
-        return center, uniformity(
-            self.simulation.coils, self.simulation.norm, self.simulation.mu0, center)
+
+        # computed once per simulation, thresholds are lookups afterwards
+        if self.simulation.uniformity_index is None:
+            with profiler.phase("homogeneity"):
+                self.simulation.uniformity_index = UniformityIndex(self.simulation.coils,
+                    self.simulation.norm, self.simulation.mu0, center,
+                    self.simulation.z_arr, self.simulation.y_arr)
+        return center, self.simulation.uniformity_index
+
+    def on_export_contours(self, widget):
+        dialog = Gtk.FileChooserDialog("Please choose a file", self.window,
+            Gtk.FileChooserAction.SAVE,
+            (Gtk.STOCK_CANCEL, Gtk.ResponseType.CANCEL,
+             Gtk.STOCK_SAVE, Gtk.ResponseType.OK))
+
+        filters = Gtk.FileFilter()
+        filters.set_name("CSV or JSON files")
+        filters.add_pattern("*.csv")
+        filters.add_pattern("*.CSV")
+        filters.add_pattern("*.json")
+        filters.add_pattern("*.JSON")
+        dialog.add_filter(filters)
+
+        response = dialog.run()
+
+        if response == Gtk.ResponseType.OK:
+            filename = dialog.get_filename()
+            if "." not in filename:
+                filename += ".csv"
+
+            center, index = self.compute_uniformity()
+            levels = sorted(set(CONTOUR_LEVELS + [self.homo / 100]))
+            index.contours.export(filename, levels)
+
+        dialog.destroy()
 
     def on_color_bar_menu(self, widget, name):
         self.colormap = name
         self.plot.update_plot(name)
 
 
-    def compute_max_square(self, center):
-        low = 0.0
-        high = max([abs(self.simulation.z_min), abs(self.simulation.z_max), abs(self.simulation.y_min), abs(self.simulation.y_max)])
-        mid = (low + high) * 0.5
-
-        p = 20
-        ones = numpy.ones(p)
-        while abs(high - low) > 1e-5:
-            line = numpy.linspace(-mid, mid, p)
-            line = numpy.linspace(-mid, mid, p)
-            down = numpy.array([line, - mid * ones]).T
-            up = numpy.array([line, mid * ones]).T
-            left = numpy.array([- mid * ones, line]).T
-            rigth = numpy.array([mid * ones, line]).T
-            points = numpy.concatenate((up, down, left, rigth), axis=0)
-            
-            decrease = False
-            for z, y in points:
-                val = compute_norm(self.simulation.coils, abs(y), z, self.simulation.mu0)
-                u = uniformity(self.simulation.coils, numpy.array([val]), self.simulation.mu0, center)[0]
-                if u < (self.homo / 100):
-                    decrease = True
-                    break
-
-            if decrease:
-                high = mid
-            else:
-                low = mid
-            mid = (low + high) * 0.5
-            
-        return mid
+    def compute_max_square(self, center, index):
+        threshold = self.homo / 100
+        key = (threshold, self.square_samples)
+        if key not in index.squares:
+            high = max([abs(self.simulation.z_min), abs(self.simulation.z_max), abs(self.simulation.y_min), abs(self.simulation.y_max)])
+
+            # no square reaches past the closest non-homogeneous grid point
+            bound = index.square_bound(threshold)
+            if bound is not None:
+                high = min(high, bound)
+
+            with profiler.phase("homogeneity"):
+                index.squares[key] = max_homogeneous_square(self.simulation.coils, self.simulation.mu0,
+                    center, threshold, high, samples=self.square_samples, norm_mid=index.norm_mid)
+        return index.squares[key]
 
 
     def plot_rectangle_homo(self):
@@ -273,10 +304,40 @@ class HomogeneityWindow():
         text += " \t\t{}\t\t\t=\t\t{:.5f}\n".format("Height [m]", self.homo_width)
         text += " \t\t{}\t\t\t=\t\t{:.5f}\n".format("Width [m]", self.homo_height)
         text += " \t\t{}\t\t\t=\t\t{:.5f}\n".format("Volume [m³]", volume)
+        text += " \t\t{}\t=\t\t{:.5f}\n".format("Volume above {}% [m³]".format(self.homo),
+            self.simulation.uniformity_index.volume(self.homo / 100))
+
+        # region connected to the center and the largest cylinder inside it
+        index = self.simulation.uniformity_index
+        cylinder = index.cylinder(self.homo / 100)
+        text += "\n"
+        text += " \t{}\n".format("Homogeneous region around the center:")
+        text += "\n"
+        text += " \t\t{}\t\t\t=\t\t{:.5f}\n".format("Volume [m³]", index.region_volume(self.homo / 100))
+        if cylinder is not None:
+            cyl_zmin, cyl_zmax, cyl_radius = cylinder
+            text += " \t\t{}\t=\t\t{:.5f}\n".format("Cylinder length [m]", cyl_zmax - cyl_zmin)
+            text += " \t\t{}\t=\t\t{:.5f}\n".format("Cylinder radius [m]", cyl_radius)
+            text += " \t\t{}\t=\t\t{:.5f}\n".format("Cylinder volume [m³]",
+                numpy.pi * cyl_radius**2 * (cyl_zmax - cyl_zmin))
         text += "\n"
         text += " \t{}\n".format("Magnetic field value at the center of the volume:")
         text += "\n"
         text += " \t\t{}\t\t\t\t\t\t=\t\t{:.5f}\n".format("Bo [mT]", Bo)
         text += " \t\t{}\t\t=\t\t(z = {:.5f}, y = {:.5f})\n".format("Center coordinates [m]", *self.center)
 
+        # zonal harmonics about the center of the axis, a quick figure of merit
+        expansion = ZonalExpansion(self.simulation.coils, self.center[0], self.simulation.mu0)
+        order = expansion.leading_order()
+        text += "\n"
+        text += " \t{}\n".format("Zonal harmonic expansion on the axis:")
+        text += "\n"
+        if order is not None:
+            text += " \t\t{}\t\t\t\t=\t\t{}\n".format("Leading error order", order)
+            text += " \t\t{}\t\t\t\t=\t\t{:.5E}\n".format("b{} / b0 [1/m^{}]".format(order, order),
+                expansion.b[order] / expansion.b[0] if expansion.b[0] else numpy.inf)
+        text += " \t\t{}\t\t=\t\t{:.5f}\n".format("Convergence radius [m]", expansion.radius)
+        text += " \t\t{}\t=\t\t{:.5f}\n".format("Radius within {}% [m]".format(self.homo),
+            expansion.homogeneous_radius(1.0 - self.homo / 100))
+
         self.txtExperimentationVolume.get_buffer().set_text(text)
@@ -26,9 +26,13 @@ from matplotlib.backends.backend_gtk3agg import FigureCanvasGTK3Agg as FigureCan
 # from matplotlib.backends.backend_gtk3cairo import FigureCanvasGTK3Cairo as FigureCanvas
 from matplotlib.backends.backend_gtk3 import NavigationToolbar2GTK3 as NavigationToolbar
 import matplotlib.patches as patches
+from matplotlib.ticker import FormatStrFormatter
 
 import numpy
 from functions import *
+from pyramid import GridPyramid
+import wires
+from profiling import profiler
 from ErrorMessage import ErrorMessage
 
 
@@ -67,6 +71,7 @@ class PlotBox():
         self.fig.patch.set_facecolor((242 / 255, 241 / 255, 240 / 255))
         self.canvas = FigureCanvas(self.fig)
         self.fig.canvas.mpl_connect("button_press_event", self.on_click)
+        self.fig.canvas.mpl_connect("draw_event", self.on_draw)
         
         self.boxPlot.pack_start(self.canvas, True, True, 0)
         self.boxPlot.pack_start(self.toolbar, False, True, 0)
@@ -85,6 +90,11 @@ class PlotBox():
             self.y_lims = y_lims
 
         self.initial_norm = self.simulation.norm.copy()
+        self.pyramid = None
+        self.ax = None
+        self.background = None
+        self.redraw = False
+        self.relimiting = False
 
         self.binary_colors = binary_colors
         self.selected_point = [[], []]
@@ -129,7 +139,14 @@ class PlotBox():
             if "." not in filename:
                 filename += ".pdf"
 
+            # animated artists are left out of savefig unless drawn as the rest
+            overlays = [artist for artist in (self.points, self.rect) if artist]
+            for artist in overlays:
+                artist.set_animated(False)
             self.fig.savefig(filename)
+            for artist in overlays:
+                artist.set_animated(True)
+            self.draw_idle()
         elif response == Gtk.ResponseType.CANCEL:
             pass
             # print("Cancel clicked")
@@ -183,12 +200,12 @@ class PlotBox():
             self.parent.zoom = 100.0
             self.parent.txtZoomValue.set_text("100.0")
 
-        self.rect = None
+        self.clear_rectangle()
         self.statBar.push(1, (""))
         self.compute_color_limits()
         self.points.set_data([], [])
         self.selected_point = [[], []]
-        self.fig.canvas.draw()
+        self.blit_overlays()
 
     def compute_color_limits(self):
         if self.binary_colors:
@@ -224,11 +241,10 @@ class PlotBox():
 
     def draw_point(self, point):
         z, y = point
-        self.points.set_data([], [])
         self.selected_point = [[z], [y]]
         self.points.set_data(*self.selected_point)
-        self.fig.canvas.draw()
-        val = compute_norm(self.simulation.coils, abs(y), z, self.simulation.mu0)
+        self.blit_overlays()
+        _, _, val = field(self.simulation.coils, abs(y), z, self.simulation.mu0, norm=True)
         # print(val)
         self.statBar.push(1, ("Coordinates: z = {:.3f}; y = {:.3f}; B = {:.2E} mT".format(
             z, y, val)))
@@ -274,37 +290,83 @@ class PlotBox():
             ErrorMessage(self.parent.window, "Invalid input parameters", "Min. value must be lower than Max. value")
         
 
-    def update_plot(self, colormap=None):
-        if colormap:
-            self.colormap = colormap
-
+    def build_plot(self):
+        # creates every artist; later changes go through update_plot
         if self.rect:
             self.rect.remove()
 
         self.fig.clf()
         self.ax = self.fig.add_subplot(111)
-        
-        self.points, = self.ax.plot(*self.selected_point, "x", c="black", ms=10)
+
+        # the marker and the rectangle are animated, i.e. left out of the
+        # normal draws and blitted over the saved background
+        self.points, = self.ax.plot(*self.selected_point, "x", c="black", ms=10, animated=True)
 
         self.ax.grid(True)
         cmap = pyplot.get_cmap(self.colormap)
-        mesh = self.ax.pcolormesh(self.z_grid, self.y_grid, self.norm,
-            shading="gouraud", cmap=cmap, vmin=self.min_val, vmax=self.max_val, zorder=-1)
+        if self.pyramid.uniform:
+            values, extent = self.image()
+            self.mesh = self.ax.imshow(values.T, origin="lower", extent=extent,
+                interpolation="nearest" if self.binary_colors else "bilinear",
+                cmap=cmap, vmin=self.min_val, vmax=self.max_val, zorder=-1)
+            self.ax.callbacks.connect("xlim_changed", self.on_limits_changed)
+            self.ax.callbacks.connect("ylim_changed", self.on_limits_changed)
+        else:
+            self.mesh = self.ax.pcolormesh(self.z_grid, self.y_grid, self.norm,
+                shading="gouraud", cmap=cmap, vmin=self.min_val, vmax=self.max_val, zorder=-1)
 
-        if self.plot_coils:
-            for coil in self.simulation.coils:
-                self.draw_coil(coil)
+        self.coil_patches = [self.draw_coil(coil) for coil in self.simulation.coils]
 
+        self.cbar = None
         if not self.binary_colors:
-            cbar = self.fig.colorbar(mesh, format=self.format)
-            cbar.set_label("B [mT]", fontsize=25)
+            self.cbar = self.fig.colorbar(self.mesh, format=self.format)
+            self.cbar.set_label("B [mT]", fontsize=25)
+
+        self.ax.set_xlabel("z [m]", fontsize=25)
+        self.ax.set_ylabel("y [m]", fontsize=25)
+
+        self.ax.xaxis.set_major_formatter(FormatStrFormatter("%.3f"))
+        self.ax.yaxis.set_major_formatter(FormatStrFormatter("%.3f"))
+        self.ax.tick_params(axis="both", labelsize=15)
+        self.ax.tick_params(axis="x", labelrotation=45)
+
+        self.ax.set_aspect("equal")
 
+        if self.rect:
+            self.ax.add_patch(self.rect)
+
+        self.update_artists()
+        self.fig.tight_layout()
+        self.fig.canvas.draw()
+
+    def image(self, z_lims=None, y_lims=None):
+        # pyramid level with about one point per pixel of the axes
+        width, height = self.ax.bbox.width, self.ax.bbox.height
+        return self.pyramid.image(z_lims or self.z_lims, y_lims or self.y_lims, width, height)
+
+    def on_limits_changed(self, ax):
+        # the navigation toolbar zooms and pans by setting the limits, the
+        # level and the window of the image follow them
+        if self.relimiting:
+            return
+        self.relimiting = True
+        try:
+            values, extent = self.image(ax.get_xlim(), ax.get_ylim())
+            self.mesh.set_data(values.T)
+            self.mesh.set_extent(extent)
+        finally:
+            self.relimiting = False
+
+    def update_artists(self):
+        for patch in self.coil_patches:
+            patch.set_visible(self.plot_coils)
+
+        if self.cbar:
             # set the ticks and ticks labels for the color bar
             labels = numpy.linspace(self.min_val, self.max_val, 5)
-            cbar.set_ticks(labels)
+            self.cbar.set_ticks(labels)
             labels = ['%.2e' % s for s in labels]
 
-
             # in case of surpass is true, the last label is modified
             if self.surpass:
                 labels[-1] = "≥" + labels[-1]
@@ -313,24 +375,61 @@ class PlotBox():
             if self.underpass:
                 labels[0] = "≤" + labels[0]
 
-            cbar.ax.set_yticklabels(labels, fontsize=15)
+            self.cbar.ax.set_yticklabels(labels, fontsize=15)
 
-        self.ax.set_xlabel("z [m]", fontsize=25)
-        self.ax.set_ylabel("y [m]", fontsize=25)
-        
         self.ax.set_xlim(self.z_lims)
         self.ax.set_ylim(self.y_lims)
 
-        self.ax.set_yticklabels(["%.3f" % s for s in self.ax.get_yticks()], fontsize=15)
-        self.ax.set_xticklabels(["%.3f" % s for s in self.ax.get_xticks()], fontsize=15, rotation=45)
-
-        self.ax.set_aspect("equal")
+    def update_plot(self, colormap=None):
+        # a new plot is drawn here; updates of an existing one are drawn on
+        # the next idle draw, outside of the "plot" phase
+        with profiler.phase("plot"):
+            if colormap:
+                self.colormap = colormap
+
+            if self.pyramid is None or self.pyramid.values is not self.initial_norm:
+                self.pyramid = GridPyramid(self.initial_norm, self.simulation.z_arr, self.simulation.y_arr,
+                    average=not self.binary_colors)
+
+            # a gouraud pcolormesh cannot take new data, it is drawn again
+            if self.ax is None or not self.pyramid.uniform:
+                self.build_plot()
+                return
+
+            values, extent = self.image()
+            self.mesh.set_data(values.T)
+            self.mesh.set_extent(extent)
+            self.mesh.set_cmap(pyplot.get_cmap(self.colormap))
+            self.mesh.set_clim(self.min_val, self.max_val)
+
+            self.update_artists()
+            self.draw_idle()
+
+    def draw_idle(self):
+        # the overlays are drawn along with the next full draw
+        self.redraw = True
+        self.fig.canvas.draw_idle()
+
+    def on_draw(self, event):
+        # savefig draws through other canvases, whose output is not the screen
+        if event.canvas is not self.canvas:
+            return
+        self.redraw = False
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self.draw_overlays()
 
+    def draw_overlays(self):
+        self.ax.draw_artist(self.points)
         if self.rect:
-            self.ax.add_patch(self.rect)
+            self.ax.draw_artist(self.rect)
 
-        self.fig.tight_layout()
-        self.fig.canvas.draw()
+    def blit_overlays(self):
+        if self.background is None or self.redraw:
+            self.draw_idle()
+            return
+        self.canvas.restore_region(self.background)
+        self.draw_overlays()
+        self.canvas.blit(self.fig.bbox)
 
 
     def on_hide_show_coils(self, widget):
@@ -341,15 +440,14 @@ class PlotBox():
         else:
             self.lblHideShowCoils.set_text("Hide coils")
 
-        self.update_plot()
+        self.update_artists()
+        self.draw_idle()
 
 
 
     def draw_coil(self, coil):
-        gauge, diameter, section, resist, Inominal = numpy.loadtxt(resource_dir + "/awg.dat", unpack=True)
-        Imax = abs(coil.I)
-        index = numpy.argmin(Inominal > Imax) - 1
-        diameter = diameter[index] / 1000
+        table = wires.load(resource_dir + "/awg.dat")
+        diameter = table.diameter[table.index(coil.I)] / 1000
 
         width = numpy.sqrt(coil.num_turns) * diameter
 
@@ -360,6 +458,7 @@ class PlotBox():
             
 
         self.ax.add_patch(rect)
+        return rect
 
 
     def update_cursor_position(self, event):
@@ -378,13 +477,13 @@ class PlotBox():
             self.rect.remove()
         
         self.rect = patches.Rectangle((xmin, ymin), (xmax - xmin), (ymax - ymin), 
-            linewidth=2, edgecolor='black', facecolor='none', zorder=100)
+            linewidth=2, edgecolor='black', facecolor='none', zorder=100, animated=True)
         self.ax.add_patch(self.rect)
-        self.fig.canvas.draw()
+        self.blit_overlays()
 
 
     def clear_rectangle(self):
         if self.rect:
             self.rect.remove()
             self.rect = None
-            self.fig.canvas.draw()
+            self.blit_overlays()
@@ -19,6 +19,8 @@ import gi
 gi.require_version("Gtk", "3.0")
 from gi.repository import Gtk
 
+import matplotlib
+matplotlib.style.use('classic')
 from matplotlib import pyplot
 from matplotlib.figure import Figure
 from matplotlib.backends.backend_gtk3agg import FigureCanvasGTK3Agg as FigureCanvas
@@ -32,8 +34,8 @@ from HomogeneityWindow import HomogeneityWindow
 from coil import Coil, CreateCoil
 from CoilListRow import CoilListRow
 from About import AboutWindow
-
-import openpyxl
+from functions import electrical_parameters
+from profiling import profiler
 
 
 class Results():
@@ -117,6 +119,11 @@ class Results():
 
 
 
+    def show_profile(self):
+        # phase times of the last run, when profiling is enabled
+        if profiler.enabled:
+            self.statBar.push(2, "Profile: " + profiler.summary(since=self.simulation.profile_start))
+
     def on_zoom(self, widget):
         self.plot.clear_rectangle()
         zoom = ZoomWindow(self, self.simulation, self.colormap)
@@ -146,26 +153,8 @@ class Results():
 
 
     def populate_electrical_parameters(self):
-        gauge, diameter, section, resist, Inominal = numpy.loadtxt(resource_dir + "/awg.dat", unpack=True)
-        Imax = max([abs(coil.I) for coil in self.simulation.coils])
-        index = numpy.argmin(Inominal > Imax) - 1
-        gauge = gauge[index]
-        diameter = diameter[index]
-        section = section[index]
-        resist = resist[index]
-        Inominal = Inominal[index]
-
-        length = sum([2*numpy.pi*coil.radius*coil.num_turns for coil in self.simulation.coils]) * 1.05
-        
-        self.electrical_values = {
-            "AWG Gauge": int(gauge),
-            "Wire diameter [mm]": diameter,
-            "Wire cross sectional area [mm2]": section,
-            "Nominal current [A]": Inominal,
-            "Maximum current [A]": Inominal * 1.1,
-            "Total wire length [m]": length,
-            "Wire resistance [Ohm]": resist * length / 1000,
-            }
+        self.electrical_values = electrical_parameters(
+            self.simulation.coils, resource_dir + "/awg.dat")
 
 
         text = "\n"
@@ -221,6 +210,12 @@ class Results():
         filters.add_pattern("*.XLSX")
         dialog.add_filter(filters)
 
+        filters = Gtk.FileFilter()
+        filters.set_name("Result files")
+        filters.add_pattern("*.mfv")
+        filters.add_pattern("*.MFV")
+        dialog.add_filter(filters)
+
         response = dialog.run()
         
         if response == Gtk.ResponseType.OK:
@@ -231,112 +226,29 @@ class Results():
                 filename += ".xlsx"
 
 
-            wb = openpyxl.Workbook()
-            wb.remove_sheet(wb.active)
-
-            wInput = wb.create_sheet('Simulation parameters')
-            wCoils = wb.create_sheet('Input parameters')
-            wElectrical = wb.create_sheet('Electrical parameters')
-            wBy = wb.create_sheet('B y')
-            wBz = wb.create_sheet('B z')
-            wBnorm = wb.create_sheet('B norm')
-            title_style = openpyxl.styles.Font(bold=True) 
-
-            wInput.cell(row=1 + 0, column=1 + 0).value = "Min. z [m]"
-            wInput.cell(row=1 + 0, column=1 + 0).font = title_style
-            wInput.cell(row=1 + 0, column=1 + 1).value = self.simulation.z_min
-            
-            wInput.cell(row=1 + 1, column=1 + 0).value = "Max. z [m]"
-            wInput.cell(row=1 + 1, column=1 + 0).font = title_style
-            wInput.cell(row=1 + 1, column=1 + 1).value = self.simulation.z_max
-            
-            wInput.cell(row=1 + 2, column=1 + 0).value = "Points z"
-            wInput.cell(row=1 + 2, column=1 + 0).font = title_style
-            wInput.cell(row=1 + 2, column=1 + 1).value = self.simulation.z_points - 1
-
-            wInput.cell(row=1 + 3, column=1 + 0).value = "Min. y [m]"
-            wInput.cell(row=1 + 3, column=1 + 0).font = title_style
-            wInput.cell(row=1 + 3, column=1 + 1).value = self.simulation.y_min
-
-            wInput.cell(row=1 + 4, column=1 + 0).value = "Max. y [m]"
-            wInput.cell(row=1 + 4, column=1 + 0).font = title_style
-            wInput.cell(row=1 + 4, column=1 + 1).value = self.simulation.y_max
-
-            wInput.cell(row=1 + 5, column=1 + 0).value = "Points y"
-            wInput.cell(row=1 + 5, column=1 + 0).font = title_style
-            wInput.cell(row=1 + 5, column=1 + 1).value = self.simulation.y_points - 1
-
-            wCoils.cell(row=1 + 0, column=1 + 0).value = "Radius [m]"
-            wCoils.cell(row=1 + 0, column=1 + 0).font = title_style
-
-            wCoils.cell(row=1 + 0, column=1 + 1).value = "Num. turns"
-            wCoils.cell(row=1 + 0, column=1 + 1).font = title_style
-
-            wCoils.cell(row=1 + 0, column=1 + 2).value = "Current [A]"
-            wCoils.cell(row=1 + 0, column=1 + 2).font = title_style
-
-            wCoils.cell(row=1 + 0, column=1 + 3).value = "Pos. Z [m]"
-            wCoils.cell(row=1 + 0, column=1 + 3).font = title_style
-
-
-            wElectrical.cell(row=1 + 0, column=1 + 0).value = "AWG Gauge"
-            wElectrical.cell(row=1 + 0, column=1 + 0).font = title_style
-            wElectrical.cell(row=1 + 0, column=1 + 1).value = self.electrical_values["AWG Gauge"]
-            wElectrical.cell(row=1 + 1, column=1 + 0).value = "Wire diameter [mm]"
-            wElectrical.cell(row=1 + 1, column=1 + 0).font = title_style
-            wElectrical.cell(row=1 + 1, column=1 + 1).value = self.electrical_values["Wire diameter [mm]"]
-            wElectrical.cell(row=1 + 2, column=1 + 0).value = "Wire cross sectional area [mm2]"
-            wElectrical.cell(row=1 + 2, column=1 + 0).font = title_style
-            wElectrical.cell(row=1 + 2, column=1 + 1).value = self.electrical_values["Wire cross sectional area [mm2]"]
-            wElectrical.cell(row=1 + 3, column=1 + 0).value = "Nominal current [A]"
-            wElectrical.cell(row=1 + 3, column=1 + 0).font = title_style
-            wElectrical.cell(row=1 + 3, column=1 + 1).value = self.electrical_values["Nominal current [A]"]
-            wElectrical.cell(row=1 + 4, column=1 + 0).value = "Maximum current [A]"
-            wElectrical.cell(row=1 + 4, column=1 + 0).font = title_style
-            wElectrical.cell(row=1 + 4, column=1 + 1).value = self.electrical_values["Maximum current [A]"]
-            wElectrical.cell(row=1 + 5, column=1 + 0).value = "Total wire length [m]"
-            wElectrical.cell(row=1 + 5, column=1 + 0).font = title_style
-            wElectrical.cell(row=1 + 5, column=1 + 1).value = self.electrical_values["Total wire length [m]"]
-            wElectrical.cell(row=1 + 6, column=1 + 0).value = "Wire resistance [Ohm]"
-            wElectrical.cell(row=1 + 6, column=1 + 0).font = title_style
-            wElectrical.cell(row=1 + 6, column=1 + 1).value = self.electrical_values["Wire resistance [Ohm]"]
-
-            for i, coil in enumerate(self.simulation.coils):
-                wCoils.cell(row=1 + i + 1, column=1 + 0).value = coil.radius
-                wCoils.cell(row=1 + i + 1, column=1 + 1).value = coil.num_turns
-                wCoils.cell(row=1 + i + 1, column=1 + 2).value = coil.I
-                wCoils.cell(row=1 + i + 1, column=1 + 3).value = coil.pos_z
-
-            for i, val in enumerate(self.simulation.z_arr):
-                wBz.cell(row=1 + 0, column=1 + i + 1).value = val
-                wBz.cell(row=1 + 0, column=1 + i + 1).font=title_style
-
-                wBy.cell(row=1 + 0, column=1 + i + 1).value = val
-                wBy.cell(row=1 + 0, column=1 + i + 1).font=title_style
-
-                wBnorm.cell(row=1 + 0, column=1 + i + 1).value = val
-                wBnorm.cell(row=1 + 0, column=1 + i + 1).font=title_style
-
-
-            for i, val in enumerate(self.simulation.y_arr):
-                wBz.cell(row=1 + i + 1, column=1 + 0).value = val
-                wBz.cell(row=1 + i + 1, column=1 + 0).font = title_style
-
-                wBy.cell(row=1 + i + 1, column=1 + 0).value = val
-                wBy.cell(row=1 + i + 1, column=1 + 0).font = title_style
-
-                wBnorm.cell(row=1 + i + 1, column=1 + 0).value = val
-                wBnorm.cell(row=1 + i + 1, column=1 + 0).font = title_style
-
-
-            for i, _ in enumerate(self.simulation.z_arr):
-                for j, _ in enumerate(self.simulation.y_arr):
-                    wBz.cell(row=1 + j + 1, column=1 + i + 1).value = self.simulation.Bz_grid[i, j]
-                    wBy.cell(row=1 + j + 1, column=1 + i + 1).value = self.simulation.Brho_grid[i, j]
-                    wBnorm.cell(row=1 + j + 1, column=1 + i + 1).value = self.simulation.norm[i, j]
-
-
-            wb.save(filename)
+            grid = {
+                "z_min": self.simulation.z_min,
+                "z_max": self.simulation.z_max,
+                "z_points": self.simulation.z_points - 1,
+                "y_min": self.simulation.y_min,
+                "y_max": self.simulation.y_max,
+                "y_points": self.simulation.y_points - 1,
+            }
+            from workbook import write_results
+            from resultfile import write_results_file
+
+            with profiler.phase("export"):
+                if filename.lower().endswith(".mfv"):
+                    write_results_file(filename, self.simulation.coils, grid,
+                        self.simulation.z_arr, self.simulation.y_arr,
+                        self.simulation.Bz_grid, self.simulation.Brho_grid, self.simulation.norm,
+                        self.electrical_values)
+                else:
+                    write_results(filename, self.simulation.coils, grid,
+                        self.simulation.z_arr, self.simulation.y_arr,
+                        self.simulation.Bz_grid, self.simulation.Brho_grid, self.simulation.norm,
+                        self.electrical_values)
+            self.show_profile()
 
         elif response == Gtk.ResponseType.CANCEL:
             pass
@@ -359,53 +271,30 @@ class Results():
         filters.add_pattern("*.XLSX")
         dialog.add_filter(filters)
 
+        filters = Gtk.FileFilter()
+        filters.set_name("Result files")
+        filters.add_pattern("*.mfv")
+        filters.add_pattern("*.MFV")
+        dialog.add_filter(filters)
+
         response = dialog.run()
         
         if response == Gtk.ResponseType.OK:
             filename = dialog.get_filename()
 
 
-            wb = openpyxl.load_workbook(filename)
-            wInput = wb["Simulation parameters"]
-            wCoils = wb['Input parameters']
-            wBy = wb['B y']
-            wBz = wb['B z']
-            wBnorm = wb['B norm']
-
-            z_min = wInput.cell(row=1 +0, column=1 + 1).value
-            z_max = wInput.cell(row=1 +1, column=1 + 1).value
-            z_points = int(wInput.cell(row=1 +2, column=1 + 1).value)
-            y_min = wInput.cell(row=1 +3, column=1 + 1).value
-            y_max = wInput.cell(row=1 +4, column=1 + 1).value
-            y_points = int(wInput.cell(row=1 +5, column=1 + 1).value)
-
-            coils = []
-            for i in range(wCoils.max_row - 1):
-                radius = wCoils.cell(row=1 + i + 1, column=1 + 0).value
-                turns = int(wCoils.cell(row=1 + i + 1, column=1 + 1).value)
-                current = wCoils.cell(row=1 + i + 1, column=1 + 2).value
-                position = wCoils.cell(row=1 + i + 1, column=1 + 3).value
-                coils.append(CreateCoil("Circular", radius, turns, current, position))
-
-            z_arr = []
-            for i in range(wBz.max_column - 1):
-                z_arr.append(wBz.cell(row=1 + 0, column=1 + i + 1).value)
-
-            y_arr = []
-            for i in range(wBz.max_row - 1):
-                y_arr.append(wBz.cell(row=1 + i + 1, column=1 + 0).value)
-
-            Bz_grid = numpy.zeros(shape=(len(z_arr), len(y_arr)))
-            Brho_grid = numpy.zeros(shape=(len(z_arr), len(y_arr)))
-            norm = numpy.zeros(shape=(len(z_arr), len(y_arr)))
-            for i in range(len(z_arr) - 1):
-                for j in range(len(y_arr) - 1):
-                    Bz_grid[i, j] = wBz.cell(row=1 + j + 1, column=1 + i + 1).value
-                    Brho_grid[i, j] = wBy.cell(row=1 + j + 1, column=1 + i + 1).value
-                    norm[i, j] = wBnorm.cell(row=1 + j + 1, column=1 + i + 1).value
-
-            self.simulation.set_data(coils, z_min, z_max, z_points, y_min, y_max, y_points,
-                 z_arr, y_arr, Bz_grid, Brho_grid, norm)
+            from workbook import read_results
+            from resultfile import read_results_file
+
+            if filename.lower().endswith(".mfv"):
+                data = read_results_file(filename)
+            else:
+                data = read_results(filename)
+            grid = data["grid"]
+            self.simulation.set_data(data["coils"], grid["z_min"], grid["z_max"], grid["z_points"],
+                grid["y_min"], grid["y_max"], grid["y_points"],
+                numpy.asarray(data["z_arr"]), numpy.asarray(data["y_arr"]), numpy.asarray(data["Bz_grid"]),
+                numpy.asarray(data["Brho_grid"]), numpy.asarray(data["norm"]))
 
 
             self.load_simulation()
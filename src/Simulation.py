@@ -23,20 +23,19 @@ import timeit
 import datetime
 import threading
 
-from Results import Results
-
-from plot import plot_coils
-from matplotlib import pyplot
-import matplotlib
-matplotlib.style.use('classic')
 import numpy
-from itertools import product
 
 from functions import *
+from solver import ThroughputMeter
+from fieldcache import CachedSolver
+from profiling import profiler
+
+PROGRESS_INTERVAL = 100 # ms
 
 class Simulation(object):
-    def __init__(self, parent, coils, z_min, z_max, z_points, y_min, y_max, y_points):
+    def __init__(self, parent, coils, z_min, z_max, z_points, y_min, y_max, y_points, workers=None):
         self.parent = parent
+        self.workers = workers
         self.builder = Gtk.Builder()
         self.builder.add_from_file(resource_dir + "/running.glade")
         self.window = self.builder.get_object("wndRunning")
@@ -48,17 +47,15 @@ class Simulation(object):
         self.window.set_transient_for(parent.window)
         self.progressBar.set_fraction(0.0)
         
-        self.mu0 = 4 * numpy.pi * 1e-7 * 1000
-    
-        self.build_data(coils, z_min, z_max, z_points, y_min, y_max, y_points)
+        self.mu0 = MU0
 
-        self.pair_values = product(self.z_arr, self.y_arr)
-        self.pair_indexes = product(range(self.z_points), range(self.y_points))
-        self.count = 0
+        # the phases of this run, for the status bar of the results window
+        self.profile_start = profiler.now()
+        with profiler.phase("grid"):
+            self.build_data(coils, z_min, z_max, z_points, y_min, y_max, y_points)
 
         self.stop = False
         self.finish = False
-        self.times = []
 
 
     
@@ -67,6 +64,10 @@ class Simulation(object):
         self.thread.daemon = True
         self.thread.start()
 
+        # the UI polls the solver at a bounded rate; workers never wait on it
+        self.meter = ThroughputMeter(self.solver.total)
+        GLib.timeout_add(PROGRESS_INTERVAL, self.update_progress)
+
         self.wait_for_the_simulation()
 
         self.window.show_all()
@@ -87,13 +88,15 @@ class Simulation(object):
         self.z_grid = self.z_grid.T
         self.y_grid = self.y_grid.T
 
-        self.Bz_grid = numpy.zeros(shape=(len(self.z_arr), len(self.y_arr)))
-
-        self.Brho_grid = numpy.zeros(shape=(len(self.z_arr), len(self.y_arr)))
+        # per-coil fields are cached across simulations, see fieldcache
+        self.solver = CachedSolver(self.coils, self.z_arr, self.y_arr, self.mu0, self.workers)
+        self.Bz_grid = self.solver.Bz_grid
+        self.Brho_grid = self.solver.Brho_grid
 
         zmid = (self.z_min + self.z_max) * 0.5
         ymid = (self.y_min + self.y_max) * 0.5
         self.norm_center = compute_norm(self.coils, abs(ymid), zmid, self.mu0)
+        self.uniformity_index = None
 
     def set_data(self, coils, z_min, z_max, z_points, y_min, y_max, y_points,
                  z_arr, y_arr, Bz_grid, Brho_grid, norm):
@@ -118,6 +121,7 @@ class Simulation(object):
         zmid = (self.z_min + self.z_max) * 0.5
         ymid = (self.y_min + self.y_max) * 0.5
         self.norm_center = compute_norm(self.coils, abs(ymid), zmid, self.mu0)
+        self.uniformity_index = None
 
         self.norm = norm
         
@@ -128,8 +132,14 @@ class Simulation(object):
             if self.finish:
                 # print("finish")
                 self.parent.window.hide()
-                self.norm = numpy.sqrt(self.Brho_grid**2 + self.Bz_grid**2)
-                results = Results(self.parent, self)
+                with profiler.phase("norm"):
+                    self.norm = numpy.sqrt(self.Brho_grid**2 + self.Bz_grid**2)
+
+                # matplotlib is first imported here, see interface.py
+                with profiler.phase("results"):
+                    from Results import Results
+                    results = Results(self.parent, self)
+                results.show_profile()
 
                 # from matplotlib import pyplot
                 # flatten = self.norm.flatten()
@@ -143,39 +153,22 @@ class Simulation(object):
     def on_cancel(self, widget):
         self.stop = True
         self.finish = False
+        self.solver.cancel()
 
 
     def update_progress(self):
-        self.progressBar.set_fraction(self.count / (self.z_points * self.y_points))
-        ETA = numpy.mean(self.times) * (self.z_points * self.y_points - self.count)
-        self.lblETA.set_text("ETA : %s seconds" % str(datetime.timedelta(seconds=int(ETA))))
-        return False
-
-
-    def step(self):
-        start = timeit.default_timer()
+        count = self.solver.count
+        self.meter.update(count)
+        self.progressBar.set_fraction(count / self.solver.total if self.solver.total else 1.0)
 
-        z, y = next(self.pair_values)
-        i, j = next(self.pair_indexes)
-
-        self.Bz_grid[i, j] = Bz(self.coils, abs(y), z, self.mu0)
-        self.Brho_grid[i, j] = Brho(self.coils, abs(y), z, self.mu0)
-        self.count += 1
-
-        if (i == (self.z_points - 1) and j == (self.y_points - 1)):
-            self.stop = True
-            self.finish = True
-
-        stop = timeit.default_timer()
-        self.times.append(stop - start)
-
-        GLib.idle_add(self.update_progress)
-        # print(i, j, self.progressBar.get_fraction())
+        ETA = self.meter.eta()
+        if ETA is not None:
+            self.lblETA.set_text("ETA : %s seconds" % str(datetime.timedelta(seconds=int(ETA))))
+        return self.thread.is_alive()
 
 
     def run(self):
-        while not self.stop:
-            self.step()
+        with profiler.phase("field"):
+            self.finish = self.solver.run()
+        self.stop = True
         self.window.close()
-
-
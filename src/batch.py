@@ -0,0 +1,110 @@
+import sys
+
+is_frozen = getattr(sys, 'frozen', False)
+frozen_temp_path = getattr(sys, '_MEIPASS', '')
+
+import os
+
+# This is needed to find resources when using pyinstaller
+if is_frozen:
+    basedir = frozen_temp_path
+else:
+    basedir = os.path.dirname(os.path.abspath(__file__))
+resource_dir = os.path.join(basedir, 'resources')
+
+
+
+# Headless entry point: runs a simulation from a parameters workbook (the
+# format accepted by "Load parameters" in the input window) and writes the
+# results to disk without importing GTK or matplotlib.
+#
+#     python batch.py params.xlsx results.mfv [--workers N] [--compress] [--profile report.json]
+#
+# Results are written as .xlsx or .mfv (both importable through "Load
+# results", see resultfile.py) or, when the output name ends in .npz, as a
+# compressed NumPy archive. --profile writes the time, CPU time, peak memory
+# and elliptic integral count of each phase as JSON (see profiling.py).
+
+import argparse
+import timeit
+
+import numpy
+
+from functions import MU0, compute_norm, electrical_parameters
+from solver import TiledSolver
+from workbook import read_params, write_results
+from resultfile import write_results_file
+from profiling import profiler
+
+
+def build_axes(grid):
+    z_arr = numpy.linspace(grid["z_min"], grid["z_max"], grid["z_points"] + 1)
+    y_arr = numpy.linspace(grid["y_min"], grid["y_max"], grid["y_points"] + 1)
+    return z_arr, y_arr
+
+
+def run(coils, grid, workers=None):
+    with profiler.phase("grid"):
+        z_arr, y_arr = build_axes(grid)
+        solver = TiledSolver(coils, z_arr, y_arr, MU0, workers)
+    with profiler.phase("field"):
+        solver.run()
+    with profiler.phase("norm"):
+        norm = numpy.sqrt(solver.Brho_grid**2 + solver.Bz_grid**2)
+    return z_arr, y_arr, solver.Bz_grid, solver.Brho_grid, norm
+
+
+def save(filename, coils, grid, z_arr, y_arr, Bz_grid, Brho_grid, norm, compress=False):
+    electrical_values = electrical_parameters(coils, resource_dir + "/awg.dat")
+    if filename.lower().endswith(".mfv"):
+        write_results_file(filename, coils, grid, z_arr, y_arr,
+            Bz_grid, Brho_grid, norm, electrical_values, compress)
+    elif filename.lower().endswith(".npz"):
+        numpy.savez_compressed(filename,
+            coils=numpy.array([[c.radius, c.num_turns, c.I, c.pos_z] for c in coils]),
+            grid=numpy.array([grid[key] for key in ("z_min", "z_max", "z_points", "y_min", "y_max", "y_points")]),
+            z_arr=z_arr, y_arr=y_arr, Bz_grid=Bz_grid, Brho_grid=Brho_grid, norm=norm)
+    else:
+        write_results(filename, coils, grid, z_arr, y_arr,
+            Bz_grid, Brho_grid, norm, electrical_values)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a coil simulation without the GUI.")
+    parser.add_argument("params", help="parameters workbook (.xlsx) as saved by the GUI")
+    parser.add_argument("output", help="results file (.xlsx, .mfv or .npz)")
+    parser.add_argument("--workers", type=int, default=None, help="worker threads (default: all cores)")
+    parser.add_argument("--compress", action="store_true",
+        help="compress the grids of a .mfv output (smaller, slower to load)")
+    parser.add_argument("--profile", default=None, metavar="FILE",
+        help="write the time, peak memory and elliptic integral count of each phase to FILE (JSON)")
+    args = parser.parse_args(argv)
+
+    if args.profile:
+        profiler.enable()
+
+    coils, grid = read_params(args.params)
+    if len(coils) == 0:
+        parser.error("{} does not define any coil".format(args.params))
+
+    start = timeit.default_timer()
+    z_arr, y_arr, Bz_grid, Brho_grid, norm = run(coils, grid, args.workers)
+    elapsed = timeit.default_timer() - start
+
+    with profiler.phase("export"):
+        save(args.output, coils, grid, z_arr, y_arr, Bz_grid, Brho_grid, norm, args.compress)
+
+    zmid = (grid["z_min"] + grid["z_max"]) * 0.5
+    ymid = (grid["y_min"] + grid["y_max"]) * 0.5
+    print("{} coils, {} x {} points in {:.3f} s".format(len(coils), len(z_arr), len(y_arr), elapsed))
+    print("B at the center = {:.5E} mT".format(compute_norm(coils, abs(ymid), zmid, MU0)))
+    print("Results written to {}".format(args.output))
+
+    if args.profile:
+        profiler.write(args.profile)
+        print("Profile: {}".format(profiler.summary()))
+        print("Profile written to {}".format(args.profile))
+
+
+if __name__ == "__main__":
+    main()
@@ -24,19 +24,24 @@ class CircularCoil(Coil):
         self.shape = "Circular"
 
 
+    def field(self, rho, z):
+        # Bz and Brho share k^2, K(k^2) and E(k^2), so both come from one pass
+        dz = z - self.pos_z
+        far2 = (self.radius + rho)**2 + dz**2
+        near2 = (self.radius - rho)**2 + dz**2
+        kto2 = 4.0 * self.radius * rho / far2
+        K_val = K(kto2)
+        E_val = E(kto2)
+
+        factor = self.num_turns * self.I / (2.0 * numpy.pi * numpy.sqrt(far2))
+        Bz = factor * ((self.radius**2 - rho**2 - dz**2) * E_val / near2 + K_val)
+        Brho = factor * dz / rho * ((self.radius**2 + rho**2 + dz**2) * E_val / near2 - K_val)
+        return Bz, Brho
+
+
     def Brho(self, rho, z):
-        kto2 = 4.0 * self.radius * rho / (
-            (self.radius + rho)**2 + (z - self.pos_z)**2)
-        return (self.num_turns * self.I * (z - self.pos_z) / (2.0 * numpy.pi * rho * numpy.sqrt((
-            rho + self.radius)**2 + (z - self.pos_z)**2))) * \
-            ((self.radius**2 + rho**2 + (z - self.pos_z)**2) * E(kto2) / (
-                (self.radius - rho)**2 + (z - self.pos_z)**2) - K(kto2) )
+        return self.field(rho, z)[1]
 
 
     def Bz(self, rho, z):
-        kto2 = 4.0 * self.radius * rho / (
-            (self.radius + rho)**2 + (z - self.pos_z)**2)
-        return (self.num_turns * self.I / (2.0 * numpy.pi * numpy.sqrt((
-            rho + self.radius)**2 + (z - self.pos_z)**2))) * \
-            ((self.radius**2 - rho**2 - (z - self.pos_z)**2) * E(kto2) / (
-                (self.radius - rho)**2 + (z - self.pos_z)**2) + K(kto2) )
\ No newline at end of file
+        return self.field(rho, z)[0]
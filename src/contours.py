@@ -0,0 +1,173 @@
+import csv
+import json
+
+import numpy
+
+# Marching squares over a grid indexed [z, y]. The corners of the cell (i, j)
+# are numbered c0 = (i, j), c1 = (i + 1, j), c2 = (i + 1, j + 1), c3 = (i, j + 1)
+# and its edges e0 = c0-c1, e1 = c1-c2, e2 = c3-c2, e3 = c0-c3. The case of a
+# cell has bit k set when corner ck is at or above the level. Every edge of the
+# grid has a global id, so the segments of neighbouring cells share the id of
+# the edge they cross and are stitched into polylines through it.
+
+# edge pairs crossed in each case, -1 when unused; the saddles 5 and 10 are
+# listed for a center below the level and swapped in SADDLES otherwise
+SEGMENTS = numpy.array([
+    [-1, -1, -1, -1],
+    [3, 0, -1, -1],
+    [0, 1, -1, -1],
+    [3, 1, -1, -1],
+    [1, 2, -1, -1],
+    [3, 0, 1, 2],
+    [0, 2, -1, -1],
+    [3, 2, -1, -1],
+    [2, 3, -1, -1],
+    [0, 2, -1, -1],
+    [0, 1, 2, 3],
+    [1, 2, -1, -1],
+    [1, 3, -1, -1],
+    [0, 1, -1, -1],
+    [3, 0, -1, -1],
+    [-1, -1, -1, -1],
+])
+
+SADDLES = {5: [0, 1, 2, 3], 10: [3, 0, 1, 2]}
+
+
+def cell_segments(values, level):
+    # (m, 2) global edge ids of the segments crossing the level
+    nz, ny = values.shape
+    above = (values >= level).view(numpy.uint8)
+    case = above[:-1, :-1] | (above[1:, :-1] << 1) | (above[1:, 1:] << 2) | (above[:-1, 1:] << 3)
+    i, j = numpy.nonzero((case != 0) & (case != 15))
+    case = case[i, j]
+
+    edges = SEGMENTS[case]
+    saddle = (case == 5) | (case == 10)
+    if saddle.any():
+        si, sj = i[saddle], j[saddle]
+        center = values[si, sj] + values[si + 1, sj] + values[si + 1, sj + 1] + values[si, sj + 1]
+        for number, swapped in SADDLES.items():
+            flip = numpy.zeros(len(case), dtype=bool)
+            flip[saddle] = (case[saddle] == number) & (center >= 4 * level)
+            edges[flip] = swapped
+
+    # z edges (i, j)-(i + 1, j) come first, then y edges (i, j)-(i, j + 1)
+    z_edges = (nz - 1) * ny
+    ids = numpy.stack([i * ny + j, z_edges + (i + 1) * (ny - 1) + j,
+                       i * ny + j + 1, z_edges + i * (ny - 1) + j], axis=1)
+    ends = numpy.take_along_axis(ids, edges.clip(min=0), axis=1)
+    pairs = numpy.concatenate([ends[:, :2], ends[edges[:, 2] >= 0, 2:]])
+    return pairs
+
+
+def edge_points(values, level, edges, z_arr, y_arr):
+    # (k, 2) coordinates [z, y] where the level crosses each edge
+    nz, ny = values.shape
+    z_edges = (nz - 1) * ny
+    is_z = edges < z_edges
+    i0 = numpy.where(is_z, edges // ny, (edges - z_edges) // (ny - 1))
+    j0 = numpy.where(is_z, edges % ny, (edges - z_edges) % (ny - 1))
+    i1 = i0 + is_z
+    j1 = j0 + ~is_z
+
+    v0 = values[i0, j0]
+    v1 = values[i1, j1]
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        t = numpy.clip(numpy.nan_to_num((level - v0) / (v1 - v0)), 0.0, 1.0)
+    z = z_arr[i0] + t * (z_arr[i1] - z_arr[i0])
+    y = y_arr[j0] + t * (y_arr[j1] - y_arr[j0])
+    return numpy.stack([z, y], axis=1)
+
+
+def stitch(pairs):
+    # polylines as arrays of node numbers, along with the nodes' edge ids;
+    # a closed polyline repeats its first node at the end
+    edges, nodes = numpy.unique(pairs, return_inverse=True)
+    nodes = nodes.reshape(pairs.shape)
+
+    # every edge is shared by at most two segments: sorting the segment ends
+    # by node gives each node its (up to) two neighbours
+    source = numpy.concatenate([nodes[:, 0], nodes[:, 1]])
+    target = numpy.concatenate([nodes[:, 1], nodes[:, 0]])
+    order = numpy.argsort(source, kind="stable")
+    source, target = source[order], target[order]
+    first = numpy.searchsorted(source, source)
+    neighbours = numpy.full((len(edges), 2), -1)
+    neighbours[source, numpy.arange(len(source)) - first] = target
+
+    # open lines are walked from one of their ends, the rest are loops
+    neighbours = neighbours.tolist()
+    visited = [False] * len(edges)
+    lines = []
+    ends = [n for n, (a, b) in enumerate(neighbours) if b == -1]
+    for start in ends + list(range(len(edges))):
+        if visited[start]:
+            continue
+        line = [start]
+        visited[start] = True
+        previous, current = -1, start
+        while True:
+            a, b = neighbours[current]
+            following = b if a == previous else a
+            if following == -1:
+                break
+            if visited[following]:
+                if following == start:
+                    line.append(start)
+                break
+            line.append(following)
+            visited[following] = True
+            previous, current = current, following
+        lines.append(numpy.array(line))
+    return lines, edges
+
+
+def contours(values, z_arr, y_arr, level):
+    # list of (k, 2) arrays with the [z, y] vertices of each iso line
+    values = numpy.asarray(values, dtype=float)
+    z_arr = numpy.asarray(z_arr, dtype=float)
+    y_arr = numpy.asarray(y_arr, dtype=float)
+    if min(values.shape) < 2:
+        return []
+    pairs = cell_segments(values, level)
+    if len(pairs) == 0:
+        return []
+    lines, edges = stitch(pairs)
+    points = edge_points(values, level, edges, z_arr, y_arr)
+    return [points[line] for line in lines]
+
+
+class ContourSet(object):
+    # iso lines of one grid, computed once per level
+    def __init__(self, values, z_arr, y_arr):
+        self.values = values
+        self.z_arr = z_arr
+        self.y_arr = y_arr
+        self.lines = {}
+
+    def get(self, level):
+        if level not in self.lines:
+            self.lines[level] = contours(self.values, self.z_arr, self.y_arr, level)
+        return self.lines[level]
+
+    def to_csv(self, filename, levels):
+        with open(filename, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["level", "contour", "z [m]", "y [m]"])
+            for level in levels:
+                for k, line in enumerate(self.get(level)):
+                    for z, y in line:
+                        writer.writerow([level, k, float(z), float(y)])
+
+    def to_json(self, filename, levels):
+        data = {"levels": [{"level": level, "contours": [line.tolist() for line in self.get(level)]}
+                           for level in levels]}
+        with open(filename, "w") as f:
+            json.dump(data, f)
+
+    def export(self, filename, levels):
+        if filename.lower().endswith(".json"):
+            self.to_json(filename, levels)
+        else:
+            self.to_csv(filename, levels)
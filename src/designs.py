@@ -0,0 +1,70 @@
+import numpy
+
+from coil import CircularCoil
+
+# Published coil designs (and random sets), as lists of coils. Presets.py
+# turns them into rows of the input window; this module does not need GTK.
+
+
+def helmholtz():
+    return [
+        CircularCoil(0.2, 500, 1.0, -0.1),
+        CircularCoil(0.2, 500, 1.0, 0.1),
+    ]
+
+
+def maxwell():
+    return [
+        CircularCoil(0.2*numpy.sqrt(4/7), 490, 1.0, -0.2*numpy.sqrt(3/7)),
+        CircularCoil(0.2, 640, 1.0, 0.0),
+        CircularCoil(0.2*numpy.sqrt(4/7), 490, 1.0, 0.2*numpy.sqrt(3/7)),
+    ]
+
+
+def wang():
+    return [
+        CircularCoil(0.2, 555, 1.0, -0.2*0.76),
+        CircularCoil(0.2, 295, 1.0, 0.0),
+        CircularCoil(0.2, 555, 1.0, 0.2*0.76),
+    ]
+
+
+def tetracoil():
+    radius_tetracoil = 0.2
+    return [
+        CircularCoil(radius_tetracoil*0.672, 365, 1.0, -2*radius_tetracoil*0.399),
+        CircularCoil(radius_tetracoil, 535, 1.0, -2*radius_tetracoil*0.149),
+        CircularCoil(radius_tetracoil, 535, 1.0, 2*radius_tetracoil*0.149),
+        CircularCoil(radius_tetracoil*0.672, 365, 1.0, 2*radius_tetracoil*0.399),
+    ]
+
+
+def lee_whiting():
+    radius_lee = 0.2
+    return [
+        CircularCoil(radius_lee, 450, 1.0, -2*radius_lee*0.4704),
+        CircularCoil(radius_lee, 200, 1.0, -2*radius_lee*0.1216),
+        CircularCoil(radius_lee, 200, 1.0, 2*radius_lee*0.1216),
+        CircularCoil(radius_lee, 450, 1.0, 2*radius_lee*0.4704),
+    ]
+
+
+def random_coils(N, seed=None):
+    rng = numpy.random.RandomState(seed) if seed is not None else numpy.random
+    coils = []
+    for i in range(N):
+        radius = rng.uniform(0.1, 1.0)
+        turns = rng.randint(10, 500)
+        current = rng.uniform(1.0, 5.0)
+        position = rng.uniform(-1.0, 1.0)
+        coils.append(CircularCoil(radius, turns, current, position))
+    return coils
+
+
+DESIGNS = {
+    "helmholtz": helmholtz,
+    "maxwell": maxwell,
+    "wang": wang,
+    "tetracoil": tetracoil,
+    "lee_whiting": lee_whiting,
+}
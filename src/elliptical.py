@@ -1,15 +1,20 @@
-from scipy.integrate import simps
+# Complete elliptic integrals of the first and second kind, evaluated in
+# closed form (Cephes, machine precision) for scalars or arrays of k^2.
+# scipy is imported on the first call, not when the GUI starts.
 import numpy
 
-def K(kto2, points=1000):
-    phi = numpy.linspace(0, 0.5 * numpy.pi, points)
-    values = numpy.zeros_like(kto2)
-    func = 1.0 / numpy.sqrt(1 - kto2 * numpy.sin(phi))
-    return simps(func, phi)
+import profiling
 
 
-def E(kto2, points=1000):
-    phi = numpy.linspace(0, 0.5 * numpy.pi, points)
-    values = numpy.zeros_like(kto2)
-    func = numpy.sqrt(1 - kto2 * numpy.sin(phi))
-    return simps(func, phi)
\ No newline at end of file
+def K(kto2):
+    from scipy.special import ellipk
+    if profiling.profiler.enabled:
+        profiling.profiler.count("elliptic_K", numpy.size(kto2))
+    return ellipk(kto2)
+
+
+def E(kto2):
+    from scipy.special import ellipe
+    if profiling.profiler.enabled:
+        profiling.profiler.count("elliptic_E", numpy.size(kto2))
+    return ellipe(kto2)
@@ -0,0 +1,177 @@
+import collections
+import hashlib
+import threading
+
+import numpy
+
+from coil import CircularCoil
+from functions import field
+from solver import TiledSolver, is_mirrored, mirror_y, mirror_z, split_tiles, symmetry_center
+
+
+def grid_key(z_arr, y_arr):
+    z_arr = numpy.ascontiguousarray(z_arr, dtype=float)
+    y_arr = numpy.ascontiguousarray(y_arr, dtype=float)
+    digest = hashlib.sha1(z_arr.tobytes() + y_arr.tobytes()).hexdigest()
+    return (len(z_arr), len(y_arr), digest)
+
+
+class FieldCache(object):
+    # LRU cache of the field of single coils with num_turns = 1 and I = 1 A,
+    # keyed by (radius, pos_z, mu0, grid) and bounded by the bytes it holds.
+    # The field is linear in num_turns * I, so any cached coil is a rescale
+    # away.
+    def __init__(self, max_bytes=256 * 2**20):
+        self.max_bytes = max_bytes
+        self.entries = collections.OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, Bz_unit, Brho_unit):
+        size = Bz_unit.nbytes + Brho_unit.nbytes
+        if size > self.max_bytes:
+            return
+
+        Bz_unit.setflags(write=False)
+        Brho_unit.setflags(write=False)
+        with self.lock:
+            if key in self.entries:
+                old_Bz, old_Brho = self.entries.pop(key)
+                self.nbytes -= old_Bz.nbytes + old_Brho.nbytes
+            while self.entries and self.nbytes + size > self.max_bytes:
+                _, (old_Bz, old_Brho) = self.entries.popitem(last=False)
+                self.nbytes -= old_Bz.nbytes + old_Brho.nbytes
+            self.entries[key] = (Bz_unit, Brho_unit)
+            self.nbytes += size
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.nbytes = 0
+
+
+default_cache = FieldCache()
+
+
+class CachedSolver(TiledSolver):
+    # Builds the grid as the sum of cached unit-coil fields scaled by
+    # num_turns * I. Only coils missing from the cache are evaluated, each on
+    # its own and regularized against its own position. A missing coil whose
+    # mirror twin about the center of a symmetric z grid is also missing is
+    # derived from the twin by flipping the rows, and a coil on the center
+    # plane itself, e.g. the middle coil of a Maxwell pair, is evaluated on
+    # the upper half of the rows and mirrored. The unit fields held for
+    # missing coils are bounded by the cache budget: coils past it are summed
+    # straight into the grid, as TiledSolver does, and are not cached.
+    def __init__(self, coils, z_arr, y_arr, mu0, workers=None, tile_size=64, symmetry=True, cache=None):
+        TiledSolver.__init__(self, coils, z_arr, y_arr, mu0, workers, tile_size, symmetry)
+        self.cache = cache if cache is not None else default_cache
+
+        z_points, y_points = len(self.z_arr), len(self.y_arr)
+        grid = grid_key(self.z_arr, self.y_arr)
+        z_center = 0.5 * (self.z_arr[0] + self.z_arr[-1])
+        z_flip = symmetry and is_mirrored(self.z_arr, z_center)
+        z_half = z_points // 2 if z_flip else 0
+
+        self.keys = [(coil.radius, coil.pos_z, mu0, grid) for coil in coils]
+        self.units = {}
+        self.jobs = []
+        self.twins = []
+        self.direct = []
+        self.direct_keys = set()
+        budget = self.cache.max_bytes // (2 * z_points * y_points * numpy.dtype(float).itemsize)
+        pending = {}
+        for key, coil in zip(self.keys, coils):
+            if key in self.direct_keys:
+                self.direct.append(coil)
+                continue
+            if key in self.units or key in pending:
+                continue
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.units[key] = cached
+                continue
+
+            if len(self.jobs) + len(self.twins) >= budget:
+                self.direct_keys.add(key)
+                self.direct.append(coil)
+                continue
+
+            twin = pending.get((coil.radius, round(coil.pos_z - z_center, 12))) if z_flip else None
+            if twin is not None:
+                self.twins.append((key, twin))
+                pending[key] = None
+                continue
+
+            unit = CircularCoil(coil.radius, 1, 1.0, coil.pos_z)
+            z_start = z_half if round(coil.pos_z - z_center, 12) == 0 else 0
+            self.jobs.append((key, unit, z_start,
+                numpy.zeros(shape=(z_points, y_points)), numpy.zeros(shape=(z_points, y_points))))
+            pending[key] = key
+            pending[(coil.radius, round(z_center - coil.pos_z, 12))] = key
+
+        # the coils summed directly are mirrored in z if they are a
+        # symmetric set about the center of the grid
+        center = symmetry_center(self.direct) if z_half and self.direct else None
+        self.direct_start = z_half if center is not None and round(center - z_center, 12) == 0 else 0
+
+        # each coil is mirror-symmetric in y, but z symmetry is per coil
+        starts = [job[2] for job in self.jobs] + ([self.direct_start] if self.direct else [])
+        self.z_start = min(starts) if starts else 0
+        self.tiles = split_tiles(z_points, y_points, self.tile_size, self.z_start, self.y_start)
+        self.total = sum(z_points - start for start in starts) * (y_points - self.y_start)
+
+    def compute_tile(self, tile):
+        rows, cols = tile
+        rho = numpy.abs(self.y_arr[cols])[None, :]
+        count = 0
+        for key, unit, z_start, Bz_unit, Brho_unit in self.jobs:
+            part = slice(max(rows.start, z_start), rows.stop)
+            if part.start < part.stop:
+                z = self.z_arr[part, None]
+                Bz_unit[part, cols], Brho_unit[part, cols] = field([unit], rho, z, self.mu0)
+                count += (part.stop - part.start) * (cols.stop - cols.start)
+        part = slice(max(rows.start, self.direct_start), rows.stop)
+        if self.direct and part.start < part.stop:
+            z = self.z_arr[part, None]
+            self.Bz_grid[part, cols], self.Brho_grid[part, cols] = field(self.direct, rho, z, self.mu0)
+            count += (part.stop - part.start) * (cols.stop - cols.start)
+        return count
+
+    def finish(self):
+        for key, unit, z_start, Bz_unit, Brho_unit in self.jobs:
+            mirror_y(Bz_unit, Brho_unit, self.y_start, z_start)
+            mirror_z(Bz_unit, Brho_unit, z_start)
+            self.units[key] = (Bz_unit, Brho_unit)
+            self.cache.put(key, Bz_unit, Brho_unit)
+
+        for key, source in self.twins:
+            Bz_unit, Brho_unit = self.units[source]
+            self.units[key] = (Bz_unit[::-1].copy(), -Brho_unit[::-1])
+            self.cache.put(key, *self.units[key])
+
+        # the coils summed directly fill the computed columns of the grid
+        if self.direct:
+            mirror_y(self.Bz_grid, self.Brho_grid, self.y_start, self.direct_start)
+            mirror_z(self.Bz_grid, self.Brho_grid, self.direct_start)
+        else:
+            self.Bz_grid[:] = 0.0
+            self.Brho_grid[:] = 0.0
+        for key, coil in zip(self.keys, self.coils):
+            if key in self.direct_keys:
+                continue
+            Bz_unit, Brho_unit = self.units[key]
+            self.Bz_grid += (coil.num_turns * coil.I) * Bz_unit
+            self.Brho_grid += (coil.num_turns * coil.I) * Brho_unit
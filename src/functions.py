@@ -3,40 +3,106 @@ from numbers import Number
 from functools import reduce
 import numpy
 
+import wires
+
+MU0 = 4 * numpy.pi * 1e-7 * 1000
+
 def compute_norm(coils, rho, z, mu0):
-    return numpy.sqrt(Bz(coils, rho, z, mu0)**2 + Brho(coils, rho, z, mu0)**2)
+    return field(coils, rho, z, mu0, norm=True)[2]
 
 
-def Bz(coils, rho, z, mu0):
-    if rho == 0.0:
-        rho = numpy.finfo(numpy.float32).eps
+def regularize(coils, rho, z):
+    # rho and z may be scalars or arrays; singular points are nudged by eps.
+    # Brho divides a cancelling difference by rho, so rho is kept at least eps
+    # from the axis (e.g. the -5.6E-17 that linspace gives instead of 0)
+    eps = numpy.finfo(numpy.float32).eps
+    rho = numpy.where(numpy.abs(rho) < eps, eps, rho)
     for coil in coils:
-        if z == coil.pos_z:
-            z = coil.pos_z - numpy.finfo(numpy.float32).eps
+        z = numpy.where(z == coil.pos_z, coil.pos_z - eps, z)
+    return rho, z
 
-    return numpy.sum([mu0 * coil.Bz(rho, z) for coil in coils])
+
+def field(coils, rho, z, mu0, norm=False):
+    rho, z = regularize(coils, rho, z)
+    shape = numpy.broadcast(rho, z).shape
+    Bz_total = numpy.zeros(shape)
+    Brho_total = numpy.zeros(shape)
+    for coil in coils:
+        Bz_coil, Brho_coil = coil.field(rho, z)
+        Bz_total += mu0 * Bz_coil
+        Brho_total += mu0 * Brho_coil
+
+    if norm:
+        norm_total = numpy.sqrt(Bz_total**2 + Brho_total**2)
+        return Bz_total[()], Brho_total[()], norm_total[()]
+    return Bz_total[()], Brho_total[()]
+
+
+def Bz(coils, rho, z, mu0):
+    return field(coils, rho, z, mu0)[0]
 
 
 def Brho(coils, rho, z, mu0):
-    if rho == 0.0:
-        rho = numpy.finfo(numpy.float32).eps
-    for coil in coils:
-        if z == coil.pos_z:
-            z = coil.pos_z - numpy.finfo(numpy.float32).eps
-    return numpy.sum([mu0 * coil.Brho(rho, z) for coil in coils])
+    return field(coils, rho, z, mu0)[1]
 
 
-def uniformity(coils, norm, mu0, center):
+def center_norm(coils, mu0, center):
     zmid, ymid = center
     if ymid == 0.0:
         ymid = numpy.finfo(numpy.float32).eps
+    return field(coils, numpy.abs(ymid), zmid, mu0, norm=True)[2]
 
-    Bz_mid = Bz(coils, numpy.abs(ymid), zmid, mu0)
-    Brho_mid = Brho(coils, numpy.abs(ymid), zmid, mu0)
 
+def uniformity(coils, norm, mu0, center, norm_mid=None):
+    # norm_mid may be passed to avoid recomputing the field at the center
+    if norm_mid is None:
+        norm_mid = center_norm(coils, mu0, center)
 
-    norm_mid = numpy.sqrt(Bz_mid**2 + Brho_mid**2)
-    
     values = 1.0 - numpy.abs((norm - norm_mid) / norm_mid)
     values[values <= 0.0] = 0.0
     return values
+
+
+def max_homogeneous_square(coils, mu0, center, threshold, high, samples=20, tol=1e-5, norm_mid=None):
+    # bisection on the half side of the square centered at the origin whose
+    # boundary, sampled with `samples` points per side, keeps the uniformity
+    # above threshold; all boundary points of a step are evaluated at once
+    if norm_mid is None:
+        norm_mid = center_norm(coils, mu0, center)
+
+    low = 0.0
+    mid = (low + high) * 0.5
+    ones = numpy.ones(samples)
+    while abs(high - low) > tol:
+        line = numpy.linspace(-mid, mid, samples)
+        z = numpy.concatenate([line, line, -mid * ones, mid * ones])
+        y = numpy.concatenate([mid * ones, -mid * ones, line, line])
+        norm = field(coils, numpy.abs(y), z, mu0, norm=True)[2]
+        if numpy.any(uniformity(coils, norm, mu0, center, norm_mid) < threshold):
+            high = mid
+        else:
+            low = mid
+        mid = (low + high) * 0.5
+    return mid
+
+
+def electrical_parameters(coils, awg_file):
+    table = wires.load(awg_file)
+    index = table.select([coil.I for coil in coils])
+    gauge = table.gauge[index]
+    diameter = table.diameter[index]
+    section = table.section[index]
+    resist = table.resist[index]
+    Inominal = table.nominal[index]
+
+    length = sum([2*numpy.pi*coil.radius*coil.num_turns for coil in coils]) * 1.05
+
+    return {
+        "AWG Gauge": int(gauge),
+        "Wire diameter [mm]": diameter,
+        "Wire cross sectional area [mm2]": section,
+        "Nominal current [A]": Inominal,
+        "Maximum current [A]": Inominal * 1.1,
+        "Total wire length [m]": length,
+        "Wire resistance [Ohm]": resist * length / 1000,
+        }
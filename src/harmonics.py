@@ -0,0 +1,139 @@
+import numpy
+
+from functions import MU0
+
+# Zonal-harmonic expansion of the field of a set of coaxial circular coils
+# about a point c of the axis. With r, theta the spherical coordinates about c
+# (z - c = r cos(theta), rho = r sin(theta)):
+#
+#     Bz   =  sum_n b_n r^n P_n(cos(theta))
+#     Brho = -sum_n b_n r^n P_n^1(cos(theta)) / (n + 1)
+#
+# where P_n^1(u) = sqrt(1 - u^2) P_n'(u). b_n are the Taylor coefficients of
+# the field on the axis. For a loop, Bz(c + t) = C (R^2 + (c + t - pos_z)^2)^(-3/2)
+# with C = mu0 N I R^2 / 2, and the generating function of the Legendre
+# polynomials gives
+#
+#     b_n = C P'_{n+1}(x) / D^(n + 3),   D = sqrt(R^2 + (pos_z - c)^2),   x = (pos_z - c) / D
+#
+# The series of each loop converges for r < D, the distance from c to its winding.
+
+
+def legendre(order, u):
+    # P_0..P_order and their derivatives at u, stacked along the first axis
+    u = numpy.asarray(u, dtype=float)
+    P = numpy.zeros((order + 1,) + u.shape)
+    dP = numpy.zeros((order + 1,) + u.shape)
+    P[0] = 1.0
+    if order > 0:
+        P[1] = u
+        dP[1] = 1.0
+    for n in range(1, order):
+        P[n + 1] = ((2 * n + 1) * u * P[n] - n * P[n - 1]) / (n + 1)
+        dP[n + 1] = (n + 1) * P[n] + u * dP[n]
+    return P, dP
+
+
+def loop_terms(radius, offset, order):
+    # g[n, k] = R^2 P'_{n+1}(x) / D^(n + 3) of the loops of radius R at offset
+    # d = pos_z - c from the center, so that b_n = sum_k mu0 N_k I_k g[n, k] / 2,
+    # along with the derivatives of g with respect to R and d
+    R = numpy.asarray(radius, dtype=float)
+    d = numpy.asarray(offset, dtype=float)
+    D = numpy.hypot(R, d)
+    x = d / D
+    _, dP = legendre(order + 1, x)
+    # P''_{n+1} = (n + 2) P'_n + x P''_n
+    d2P = numpy.zeros(dP.shape)
+    for n in range(1, order + 1):
+        d2P[n + 1] = (n + 2) * dP[n] + x * d2P[n]
+
+    n = numpy.arange(order + 1)[:, None]
+    scale = D**-(n + 3.0)
+    g = R**2 * dP[1:] * scale
+    dx_dR = -d * R / D**3
+    dx_dd = R**2 / D**3
+    dg_dR = (2 * R * dP[1:] + R**2 * d2P[1:] * dx_dR) * scale - (n + 3) * g * R / D**2
+    dg_dd = R**2 * d2P[1:] * dx_dd * scale - (n + 3) * g * d / D**2
+    return g, dg_dR, dg_dd
+
+
+def coefficients(coils, center=0.0, mu0=MU0, order=20):
+    # b_0..b_order in mT / m^n
+    radius = [coil.radius for coil in coils]
+    offset = [coil.pos_z - center for coil in coils]
+    amplitude = numpy.array([0.5 * mu0 * coil.num_turns * coil.I for coil in coils])
+    g, _, _ = loop_terms(radius, offset, order)
+    return g @ amplitude
+
+
+def convergence_radius(coils, center=0.0):
+    return min(numpy.hypot(coil.radius, coil.pos_z - center) for coil in coils)
+
+
+class ZonalExpansion(object):
+    def __init__(self, coils, center=0.0, mu0=MU0, order=20):
+        self.coils = coils
+        self.center = center
+        self.mu0 = mu0
+        self.order = order
+        self.b = coefficients(coils, center, mu0, order)
+        self.radius = convergence_radius(coils, center)
+
+    def field(self, rho, z):
+        # Bz, Brho from the series; nan outside the radius of convergence
+        rho = numpy.abs(numpy.asarray(rho, dtype=float))
+        dz = numpy.asarray(z, dtype=float) - self.center
+        rho, dz = numpy.broadcast_arrays(rho, dz)
+        r = numpy.hypot(rho, dz)
+
+        # r^n P_n(cos(theta)) and r^(n - 1) P_n'(cos(theta)) follow the Legendre
+        # recurrences multiplied through by powers of r, so no division by r
+        r2 = r * r
+        P_prev, P = numpy.zeros(r.shape), numpy.ones(r.shape)
+        dP = numpy.zeros(r.shape)
+        Bz = numpy.full(r.shape, self.b[0])
+        Brho = numpy.zeros(r.shape)
+        for n in range(self.order):
+            P_prev, P, dP = P, ((2 * n + 1) * dz * P - n * r2 * P_prev) / (n + 1), (n + 1) * P + dz * dP
+            Bz += self.b[n + 1] * P
+            Brho -= self.b[n + 1] * rho * dP / (n + 2)
+
+        outside = r >= self.radius
+        Bz[outside] = numpy.nan
+        Brho[outside] = numpy.nan
+        return Bz[()], Brho[()]
+
+    def leading_order(self, rtol=1e-9):
+        # first n > 0 whose term is not negligible at the radius of convergence;
+        # the field deviates from b_0 as r^n near the center
+        scale = abs(self.b[0]) if self.b[0] else numpy.abs(self.b).max()
+        terms = numpy.abs(self.b[1:]) * self.radius**numpy.arange(1, self.order + 1)
+        significant = numpy.nonzero(terms > rtol * scale)[0]
+        return significant[0] + 1 if len(significant) else None
+
+    def homogeneous_radius(self, tolerance):
+        # radius of the sphere where sum_n |b_n| r^n, a bound of the change of
+        # Bz from b_0 since |P_n| <= 1, reaches the relative tolerance; a
+        # figure of merit to compare designs
+        if not self.b[0]:
+            return 0.0
+        n = numpy.arange(1, self.order + 1)
+        deviation = lambda r: numpy.sum(numpy.abs(self.b[1:]) * r**n) / abs(self.b[0])
+        low, high = 0.0, self.radius
+        if deviation(high) <= tolerance:
+            return high
+        while high - low > 1e-9 * self.radius:
+            mid = 0.5 * (low + high)
+            if deviation(mid) > tolerance:
+                high = mid
+            else:
+                low = mid
+        return low
+
+    def truncation_error(self, r):
+        # size of the first neglected terms relative to b_0 (|P_n| <= 1); two
+        # of them since symmetric designs have every odd coefficient zero
+        extra = coefficients(self.coils, self.center, self.mu0, self.order + 2)[self.order + 1:]
+        terms = numpy.abs(extra) * r**numpy.arange(self.order + 1, self.order + 3)
+        return terms.max() / abs(self.b[0]) if self.b[0] else numpy.inf
@@ -0,0 +1,153 @@
+import numpy
+from scipy import ndimage
+
+from contours import ContourSet
+from functions import center_norm, uniformity
+
+
+def axis_half(y_arr):
+    # columns of one sign of y, the field only depends on |y|. The half
+    # reaching farther from the axis covers the |y| range of the other one,
+    # so asymmetric grids such as [-0.3, 0.02] are measured on [-0.3, 0]
+    return y_arr >= 0 if y_arr.max() >= -y_arr.min() else y_arr <= 0
+
+
+def ring_weights(z_arr, y_arr):
+    # volume swept by each grid cell of one y half revolving about the axis
+    dz = abs(z_arr[1] - z_arr[0]) if len(z_arr) > 1 else 0.0
+    dy = abs(y_arr[1] - y_arr[0]) if len(y_arr) > 1 else 0.0
+    return numpy.where(axis_half(y_arr), 2 * numpy.pi * numpy.abs(y_arr) * dz * dy, 0.0)
+
+
+def connected_region(mask, index):
+    # points of mask 4-connected to the point index, empty if it is not in mask
+    labels, _ = ndimage.label(mask)
+    label = labels[index]
+    if label == 0:
+        return numpy.zeros(mask.shape, dtype=bool)
+    return labels == label
+
+
+def largest_rectangle(heights, value):
+    # (left, right, height) of the run of columns maximizing value(height,
+    # right - left) with height the lowest column of the run; every column is
+    # tried as the lowest one, with the run extended while no column is lower
+    n = len(heights)
+    left = numpy.zeros(n, dtype=int)
+    right = numpy.zeros(n, dtype=int)
+    stack = []
+    for i in range(n):
+        while stack and heights[stack[-1]] >= heights[i]:
+            stack.pop()
+        left[i] = stack[-1] + 1 if stack else 0
+        stack.append(i)
+    stack = []
+    for i in range(n - 1, -1, -1):
+        while stack and heights[stack[-1]] >= heights[i]:
+            stack.pop()
+        right[i] = stack[-1] - 1 if stack else n - 1
+        stack.append(i)
+
+    values = value(heights, right - left)
+    best = numpy.argmax(values)
+    return left[best], right[best], heights[best]
+
+
+def largest_cylinder(region, z_arr, y_arr):
+    # (z_min, z_max, radius) of the largest cylinder about the axis inside
+    # region: a rectangle [z_min, z_max] x [0, radius] of the half plane
+    half = numpy.nonzero(axis_half(y_arr))[0]
+    half = half[numpy.argsort(numpy.abs(y_arr[half]))]
+    columns = region[:, half]
+
+    # points of every z row reachable from the axis without leaving the region
+    heights = numpy.cumprod(columns, axis=1).sum(axis=1)
+    radius = numpy.concatenate([[0.0], numpy.abs(y_arr[half])])[heights]
+    if not heights.any():
+        return None
+
+    left, right, height = largest_rectangle(radius, lambda r, w: r**2 * (z_arr[w] - z_arr[0]))
+    return z_arr[left], z_arr[right], height
+
+
+class UniformityIndex(object):
+    # Uniformity of a simulation grid, computed once and sorted in decreasing
+    # order. The points at or above any threshold are then a prefix of that
+    # order, so their bounding box and volume are cumulative min/max/sums
+    # looked up by binary search, and the points below it are the suffix.
+    def __init__(self, coils, norm, mu0, center, z_arr, y_arr):
+        self.center = center
+        self.norm_mid = center_norm(coils, mu0, center)
+        self.values = uniformity(coils, norm, mu0, center, self.norm_mid)
+        self.masks = {}
+        self.squares = {}
+
+        z_idx, y_idx = numpy.indices(self.values.shape)
+        order = numpy.argsort(-self.values, axis=None, kind="stable")
+        # negated so that searchsorted sees an increasing array
+        self.keys = -self.values.ravel()[order]
+        z_idx = z_idx.ravel()[order]
+        y_idx = y_idx.ravel()[order]
+        self.z_low = numpy.minimum.accumulate(z_idx)
+        self.z_high = numpy.maximum.accumulate(z_idx)
+        self.y_low = numpy.minimum.accumulate(y_idx)
+        self.y_high = numpy.maximum.accumulate(y_idx)
+        self.z_arr = numpy.asarray(z_arr)
+        self.y_arr = numpy.asarray(y_arr)
+
+        self.weights = ring_weights(self.z_arr, self.y_arr)
+        self.volumes = numpy.cumsum(self.weights[y_idx])
+        self.center_index = (numpy.argmin(numpy.abs(self.z_arr - center[0])),
+                             numpy.argmin(numpy.abs(self.y_arr - center[1])))
+        self.regions = {}
+        self.contours = ContourSet(self.values, self.z_arr, self.y_arr)
+
+        # closest point, in Chebyshev distance to the origin, among the
+        # points from each position of the order to the end
+        distance = numpy.maximum(numpy.abs(self.z_arr[z_idx]), numpy.abs(self.y_arr[y_idx]))
+        self.distances = numpy.minimum.accumulate(distance[::-1])[::-1]
+
+    def count(self, threshold):
+        # number of points with uniformity >= threshold
+        return numpy.searchsorted(self.keys, -threshold, side="right")
+
+    def mask(self, threshold):
+        if threshold not in self.masks:
+            if len(self.masks) > 16:
+                self.masks.clear()
+            self.masks[threshold] = self.values >= threshold
+        return self.masks[threshold]
+
+    def bounding_box(self, threshold):
+        # (z_min, z_max, y_min, y_max) of the points at or above threshold, or None
+        k = self.count(threshold)
+        if k == 0:
+            return None
+        return (self.z_arr[self.z_low[k - 1]], self.z_arr[self.z_high[k - 1]],
+                self.y_arr[self.y_low[k - 1]], self.y_arr[self.y_high[k - 1]])
+
+    def volume(self, threshold):
+        k = self.count(threshold)
+        return self.volumes[k - 1] if k else 0.0
+
+    def square_bound(self, threshold):
+        # Chebyshev distance from the origin to the closest point below
+        # threshold, None if there is none
+        k = self.count(threshold)
+        if k == len(self.distances):
+            return None
+        return self.distances[k]
+
+    def region(self, threshold):
+        # the homogeneous region around the center, cached by threshold
+        if threshold not in self.regions:
+            if len(self.regions) > 16:
+                self.regions.clear()
+            self.regions[threshold] = connected_region(self.mask(threshold), self.center_index)
+        return self.regions[threshold]
+
+    def region_volume(self, threshold):
+        return (self.region(threshold) * self.weights[None, :]).sum()
+
+    def cylinder(self, threshold):
+        return largest_cylinder(self.region(threshold), self.z_arr, self.y_arr)
@@ -32,12 +32,14 @@ from Presets import LeeWhitingCoilPreset
 from Presets import RandomCoilPreset
 from coil import Coil, CreateCoil
 from Simulation import Simulation
-from Results import Results
 from ErrorMessage import ErrorMessage
+import profiling
 import random
 import numpy
 
-import openpyxl
+# matplotlib (through Results), openpyxl (through workbook) and scipy (through
+# elliptical) are imported when first needed, so that the input window
+# appears before they are loaded.
 
 
 class InputWindow():
@@ -97,10 +99,21 @@ class InputWindow():
         self.y_max = 0.0
         self.y_points = 0
 
+        # MFV_WORKERS=4: solver threads, all cores by default
+        self.workers = int(os.environ.get("MFV_WORKERS", 0)) or None
+
         self.window.show_all()
         self.window.maximize()
         self.listBox.create_coil_row(None)
-        
+
+        # MFV_PROFILE=report.json: per phase times in the status bars, and
+        # the whole report written at exit, see profiling.py
+        profiling.enable_from_environment()
+
+        # benchmarks/startup.py: quit as soon as the window is up
+        if os.environ.get("MFV_EXIT_ON_START"):
+            GLib.idle_add(Gtk.main_quit)
+
         Gtk.main()
 
 
@@ -208,7 +221,7 @@ class InputWindow():
             # print("lets go")
             self.simulation = Simulation(self, self.coils,
                 self.z_min, self.z_max, self.z_points,
-                self.y_min, self.y_max, self.y_points)
+                self.y_min, self.y_max, self.y_points, self.workers)
             self.simulation.simulate()
 
 
@@ -282,24 +295,14 @@ class InputWindow():
         if response == Gtk.ResponseType.OK:
             filename = dialog.get_filename()
 
-            wb = openpyxl.load_workbook(filename)
-            wInput = wb["Simulation parameters"]
-            wCoils = wb['Input parameters']
-
-            self.z_min = wInput.cell(row=1 + 0, column=1 + 1).value
-            self.z_max = wInput.cell(row=1 + 1, column=1 + 1).value
-            self.z_points = int(wInput.cell(row=1 + 2, column=1 + 1).value)
-            self.y_min = wInput.cell(row=1 + 3, column=1 + 1).value
-            self.y_max = wInput.cell(row=1 + 4, column=1 + 1).value
-            self.y_points = int(wInput.cell(row=1 + 5, column=1 + 1).value)
-
-            coils = []
-            for i in range(wCoils.max_row - 1):
-                radius = wCoils.cell(row=1 + i + 1, column=1 + 0).value
-                turns = int(wCoils.cell(row=1 + i + 1, column=1 + 1).value)
-                current = wCoils.cell(row=1 + i + 1, column=1 + 2).value
-                position = wCoils.cell(row=1 + i + 1, column=1 + 3).value
-                coils.append(CreateCoil("Circular", radius, turns, current, position))
+            from workbook import read_params
+            coils, grid = read_params(filename)
+            self.z_min = grid["z_min"]
+            self.z_max = grid["z_max"]
+            self.z_points = grid["z_points"]
+            self.y_min = grid["y_min"]
+            self.y_max = grid["y_max"]
+            self.y_points = grid["y_points"]
 
             coil_rows = []
             for coil in coils:
@@ -330,50 +333,35 @@ class InputWindow():
         filters.add_pattern("*.XLSX")
         dialog.add_filter(filters)
 
+        filters = Gtk.FileFilter()
+        filters.set_name("Result files")
+        filters.add_pattern("*.mfv")
+        filters.add_pattern("*.MFV")
+        dialog.add_filter(filters)
+
         response = dialog.run()
         
         if response == Gtk.ResponseType.OK:
             filename = dialog.get_filename()
 
 
-            wb = openpyxl.load_workbook(filename)
-            wInput = wb["Simulation parameters"]
-            wCoils = wb['Input parameters']
-            wBy = wb['B y']
-            wBz = wb['B z']
-            wBnorm = wb['B norm']
-
-            z_min = wInput.cell(row=1 +0, column=1 + 1).value
-            z_max = wInput.cell(row=1 +1, column=1 + 1).value
-            z_points = int(wInput.cell(row=1 +2, column=1 + 1).value)
-            y_min = wInput.cell(row=1 +3, column=1 + 1).value
-            y_max = wInput.cell(row=1 +4, column=1 + 1).value
-            y_points = int(wInput.cell(row=1 +5, column=1 + 1).value)
-
-            coils = []
-            for i in range(wCoils.max_row - 1):
-                radius = wCoils.cell(row=1 + i + 1, column=1 + 0).value
-                turns = int(wCoils.cell(row=1 + i + 1, column=1 + 1).value)
-                current = wCoils.cell(row=1 + i + 1, column=1 + 2).value
-                position = wCoils.cell(row=1 + i + 1, column=1 + 3).value
-                coils.append(CreateCoil("Circular", radius, turns, current, position))
-
-            z_arr = []
-            for i in range(wBz.max_column - 1):
-                z_arr.append(wBz.cell(row=1 + 0, column=1 + i + 1).value)
-
-            y_arr = []
-            for i in range(wBz.max_row - 1):
-                y_arr.append(wBz.cell(row=1 + i + 1, column=1 + 0).value)
-
-            Bz_grid = numpy.zeros(shape=(len(z_arr), len(y_arr)))
-            Brho_grid = numpy.zeros(shape=(len(z_arr), len(y_arr)))
-            norm = numpy.zeros(shape=(len(z_arr), len(y_arr)))
-            for i in range(len(z_arr) - 1):
-                for j in range(len(y_arr) - 1):
-                    Bz_grid[i, j] = wBz.cell(row=1 + j + 1, column=1 + i + 1).value
-                    Brho_grid[i, j] = wBy.cell(row=1 + j + 1, column=1 + i + 1).value
-                    norm[i, j] = wBnorm.cell(row=1 + j + 1, column=1 + i + 1).value
+            from workbook import read_results
+            from resultfile import read_results_file
+            from Results import Results
+
+            if filename.lower().endswith(".mfv"):
+                data = read_results_file(filename)
+            else:
+                data = read_results(filename)
+            coils = data["coils"]
+            grid = data["grid"]
+            z_min, z_max, z_points = grid["z_min"], grid["z_max"], grid["z_points"]
+            y_min, y_max, y_points = grid["y_min"], grid["y_max"], grid["y_points"]
+            z_arr = numpy.asarray(data["z_arr"])
+            y_arr = numpy.asarray(data["y_arr"])
+            Bz_grid = numpy.asarray(data["Bz_grid"])
+            Brho_grid = numpy.asarray(data["Brho_grid"])
+            norm = numpy.asarray(data["norm"])
 
             self.simulation = Simulation(self, coils,
                             z_min, z_max, 1,
@@ -0,0 +1,215 @@
+# Coil design search. Coils come in pairs mirrored about z = 0 (plus one coil
+# at z = 0 for odd counts), so every odd zonal harmonic vanishes, and the
+# radii, positions and turns are chosen to minimize
+#
+#     sum_{n >= 1} (b_n r0^n / b_0)^2
+#
+# the relative size of every harmonic at the target radius r0, plus a penalty
+#
+#     w mean_s max(0, |B_s| / b_0 - 1 - (1 - level))^2,   w = (1 - level)^-2
+#
+# on sample points s of the target sphere where the uniformity of the series
+# field falls below the level, which dominates as soon as the level is
+# missed. B_s is linear in the b_n, so the gradient of both terms follows
+# analytically from harmonics.loop_terms. Local searches (L-BFGS-B, within
+# the bounds) start from random designs and run in parallel processes.
+#
+#     python optimizer.py 4 params.xlsx --target-radius 0.05 --radius 0.1 0.3
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy
+from scipy.optimize import minimize
+
+from coil import CircularCoil
+from functions import MU0, field
+from harmonics import ZonalExpansion, legendre, loop_terms
+from workbook import write_params
+
+
+class CoilOptimizer(object):
+    def __init__(self, count, radius=(0.05, 0.5), position=(0.0, 0.5), turns=(10, 1000),
+                 current=1.0, target_radius=0.05, level=0.999, order=16, mu0=MU0):
+        self.count = count
+        self.pairs = count // 2
+        self.middle = count % 2
+        self.radius = radius
+        self.position = position
+        self.turns = turns
+        self.current = current
+        self.target_radius = target_radius
+        self.level = level
+        self.order = order
+        self.mu0 = mu0
+
+        # x = [radius of each pair, position of each pair, turns of each pair,
+        #      (radius, turns of the middle coil)]
+        self.bounds = ([radius] * self.pairs + [position] * self.pairs + [turns] * self.pairs +
+                       [radius, turns] * self.middle)
+
+        # Bz = A b and Brho = C b on a polar grid of the quarter of the target
+        # sphere with z, rho >= 0, the designs being symmetric about z = 0
+        r, theta = numpy.meshgrid(numpy.linspace(0.0, target_radius, 9)[1:],
+                                  numpy.linspace(0.0, 0.5 * numpy.pi, 9))
+        r, theta = r.ravel(), theta.ravel()
+        P, dP = legendre(order, numpy.cos(theta))
+        n = numpy.arange(order + 1)[:, None]
+        self.A = (r**n * P).T
+        self.C = (-r**n * numpy.sin(theta) * dP / (n + 1)).T
+
+    def unpack(self, x):
+        # radius, pos_z and num_turns of every coil, pairs as (-p, +p)
+        p = self.pairs
+        radius = numpy.concatenate([x[:p], x[:p], x[3 * p:3 * p + 1] if self.middle else []])
+        pos_z = numpy.concatenate([-x[p:2 * p], x[p:2 * p], [0.0] * self.middle])
+        turns = numpy.concatenate([x[2 * p:3 * p], x[2 * p:3 * p], x[3 * p + 1:] if self.middle else []])
+        return radius, pos_z, turns
+
+    def coils(self, x, rounded=True):
+        radius, pos_z, turns = self.unpack(x)
+        if rounded:
+            turns = numpy.round(turns).astype(int)
+        return [CircularCoil(r, int(n) if rounded else n, self.current, z)
+                for r, n, z in zip(radius, turns, pos_z)]
+
+    def objective(self, x):
+        # value and gradient with respect to x
+        radius, pos_z, turns = self.unpack(x)
+        g, dg_dR, dg_dd = loop_terms(radius, pos_z, self.order)
+        amplitude = 0.5 * self.mu0 * self.current
+        b = g @ (amplitude * turns)
+
+        weights = self.target_radius**numpy.arange(self.order + 1)
+        ratio = b[1:] * weights[1:] / b[0]
+        value = numpy.sum(ratio**2)
+
+        # d value / d b_n for n >= 1, and for b_0
+        d_b = numpy.zeros(self.order + 1)
+        d_b[1:] = 2 * ratio * weights[1:] / b[0]
+        d_b[0] = -2 * numpy.sum(ratio**2) / b[0]
+
+        # samples below the level
+        Bz = self.A @ b
+        Brho = self.C @ b
+        norm = numpy.hypot(Bz, Brho)
+        relative = norm / abs(b[0]) - 1.0
+        weight = 1.0 / (1.0 - self.level)**2 / len(norm)
+        excess = numpy.maximum(numpy.abs(relative) - (1.0 - self.level), 0.0)
+        value += weight * numpy.sum(excess**2)
+
+        d_relative = 2 * weight * excess * numpy.sign(relative)
+        d_b += ((d_relative * Bz / norm) @ self.A + (d_relative * Brho / norm) @ self.C) / abs(b[0])
+        d_b[0] -= numpy.sum(d_relative * norm) / (b[0] * abs(b[0]))
+
+        d_radius = (d_b @ dg_dR) * amplitude * turns
+        d_pos = (d_b @ dg_dd) * amplitude * turns
+        d_turns = (d_b @ g) * amplitude
+
+        p = self.pairs
+        gradient = numpy.concatenate([
+            d_radius[:p] + d_radius[p:2 * p],
+            d_pos[p:2 * p] - d_pos[:p],
+            d_turns[:p] + d_turns[p:2 * p],
+            [d_radius[2 * p], d_turns[2 * p]] if self.middle else []])
+        return value, gradient
+
+    def start_points(self, starts, seed=0):
+        rng = numpy.random.RandomState(seed)
+        low = numpy.array([bound[0] for bound in self.bounds], dtype=float)
+        high = numpy.array([bound[1] for bound in self.bounds], dtype=float)
+        return [rng.uniform(low, high) for _ in range(starts)]
+
+    def score(self, x):
+        # objective with rounded turns, or inf when a winding lies within the
+        # target radius and the expansion says nothing about the field there
+        coils = self.coils(x)
+        expansion = ZonalExpansion(coils, 0.0, self.mu0, self.order)
+        if expansion.radius <= self.target_radius:
+            return numpy.inf
+        x = numpy.array(x, dtype=float)
+        x[2 * self.pairs:3 * self.pairs] = numpy.round(x[2 * self.pairs:3 * self.pairs])
+        if self.middle:
+            x[3 * self.pairs + 1] = numpy.round(x[3 * self.pairs + 1])
+        return self.objective(x)[0]
+
+    def optimize(self, starts=16, workers=None, seed=0):
+        # designs from the best local search down, as (score, coils)
+        points = self.start_points(starts, seed)
+        workers = workers if workers else (os.cpu_count() or 1)
+        if workers == 1:
+            results = [local_search(self, x0) for x0 in points]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(local_search, [self] * len(points), points))
+
+        ranked = sorted((self.score(x), i) for i, x in enumerate(results))
+        return [(score, self.coils(results[i])) for score, i in ranked]
+
+    def deviation(self, coils, samples=2000, seed=0):
+        # largest relative deviation of |B| from the center, from the exact
+        # field on random points of the target sphere (one half plane)
+        rng = numpy.random.RandomState(seed)
+        r = self.target_radius * numpy.sqrt(rng.uniform(0, 1, samples))
+        theta = rng.uniform(0, numpy.pi, samples)
+        norm = field(coils, r * numpy.sin(theta), r * numpy.cos(theta), self.mu0, norm=True)[2]
+        norm_mid = field(coils, numpy.finfo(numpy.float32).eps, 0.0, self.mu0, norm=True)[2]
+        return numpy.abs(norm / norm_mid - 1.0).max()
+
+
+def local_search(optimizer, x0):
+    result = minimize(optimizer.objective, x0, jac=True, method="L-BFGS-B", bounds=optimizer.bounds)
+    return result.x
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search coil designs with a homogeneous center.")
+    parser.add_argument("count", type=int, help="number of coils")
+    parser.add_argument("output", help="parameters workbook (.xlsx) to load in the input window")
+    parser.add_argument("--radius", type=float, nargs=2, default=(0.05, 0.5), metavar=("MIN", "MAX"))
+    parser.add_argument("--position", type=float, nargs=2, default=(0.0, 0.5), metavar=("MIN", "MAX"),
+        help="distance of each pair of coils from the center")
+    parser.add_argument("--turns", type=float, nargs=2, default=(10, 1000), metavar=("MIN", "MAX"))
+    parser.add_argument("--current", type=float, default=1.0)
+    parser.add_argument("--target-radius", type=float, default=None,
+        help="radius of the homogeneous sphere [m]")
+    parser.add_argument("--target-volume", type=float, default=None,
+        help="volume of the homogeneous sphere [m3], instead of --target-radius")
+    parser.add_argument("--level", type=float, default=99.9,
+        help="homogeneity to reach within the target radius [%%]")
+    parser.add_argument("--starts", type=int, default=16, help="number of local searches")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.count < 1:
+        parser.error("at least one coil is needed")
+    target_radius = args.target_radius
+    if args.target_volume is not None:
+        target_radius = (3 * args.target_volume / (4 * numpy.pi))**(1.0 / 3)
+    if target_radius is None:
+        target_radius = 0.25 * args.radius[0]
+
+    optimizer = CoilOptimizer(args.count, tuple(args.radius), tuple(args.position), tuple(args.turns),
+        args.current, target_radius, args.level / 100)
+    score, coils = optimizer.optimize(args.starts, args.workers, args.seed)[0]
+
+    expansion = ZonalExpansion(coils, 0.0, optimizer.mu0)
+    print("{:>12} {:>12} {:>12} {:>12}".format("Radius [m]", "Num. turns", "Current [A]", "Pos. Z [m]"))
+    for coil in coils:
+        print("{:12.5f} {:12d} {:12.5f} {:12.5f}".format(coil.radius, coil.num_turns, coil.I, coil.pos_z))
+    print("Objective = {:.3E}, leading error order = {}".format(score, expansion.leading_order()))
+    print("Max. deviation within r = {:.4f} m: {:.3E}".format(target_radius, optimizer.deviation(coils)))
+    print("Radius within {}% (series bound) = {:.4f} m".format(args.level,
+        expansion.homogeneous_radius(1.0 - args.level / 100)))
+
+    extent = max(max(coil.radius for coil in coils), max(abs(coil.pos_z) for coil in coils)) * 1.5
+    grid = {"z_min": -extent, "z_max": extent, "z_points": 200,
+            "y_min": -extent, "y_max": extent, "y_points": 200}
+    write_params(args.output, coils, grid)
+    print("Parameters written to {}".format(args.output))
+
+
+if __name__ == "__main__":
+    main()
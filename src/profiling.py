@@ -0,0 +1,171 @@
+import atexit
+import collections
+import contextlib
+import json
+import os
+import threading
+import time
+import timeit
+import tracemalloc
+
+# Opt-in instrumentation of a simulation run. When enabled (batch.py
+# --profile FILE, or MFV_PROFILE=FILE for the GUI), every phase records its
+# wall time, the CPU time of the whole process (worker threads included, so
+# it can exceed the wall time), the peak memory traced by tracemalloc (numpy
+# arrays included) and the number of elliptic integrals evaluated by
+# elliptical.K/E. Phases nest and the peak of a phase covers its children.
+# Tracing slows down allocation heavy code such as the openpyxl export, so
+# profiled times are upper bounds. When disabled, phase() and count() do
+# nothing. tracemalloc.reset_peak is new in Python 3.9: before it, tracing
+# is restarted at each phase and the memory traced until then is kept as an
+# offset, so the peaks also count blocks freed after the restart.
+
+ELLIPTIC = ("elliptic_K", "elliptic_E")
+
+
+class Profiler(object):
+    def __init__(self):
+        self.enabled = False
+        self.offset = 0
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.reset()
+
+    def enable(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.offset = 0
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def reset(self):
+        with self.lock:
+            self.records = []
+            self.counters = collections.Counter()
+            self.origin = timeit.default_timer()
+
+    def now(self):
+        # time since the last reset, to select the phases of a run in summary()
+        return timeit.default_timer() - self.origin
+
+    def peak(self):
+        return self.offset + tracemalloc.get_traced_memory()[1]
+
+    def reset_peak(self):
+        if hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+        else:
+            self.offset += tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            tracemalloc.start()
+
+    def count(self, name, n=1):
+        if self.enabled:
+            with self.lock:
+                self.counters[name] += n
+
+    def elliptic(self):
+        return sum(self.counters[name] for name in ELLIPTIC)
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        if not self.enabled:
+            yield
+            return
+
+        stack = self.local.__dict__.setdefault("stack", [])
+        traced = tracemalloc.is_tracing()
+        if stack and traced:
+            # the peak so far belongs to the enclosing phase
+            stack[-1]["peak"] = max(stack[-1]["peak"], self.peak())
+        if traced:
+            self.reset_peak()
+
+        record = {"name": name, "depth": len(stack), "peak": 0}
+        stack.append(record)
+        start = timeit.default_timer()
+        cpu = time.process_time()
+        elliptic = self.elliptic()
+        try:
+            yield
+        finally:
+            record["start"] = start - self.origin
+            record["wall"] = timeit.default_timer() - start
+            record["cpu"] = time.process_time() - cpu
+            if traced and tracemalloc.is_tracing():
+                record["peak"] = max(record["peak"], self.peak())
+            record["elliptic"] = self.elliptic() - elliptic
+            stack.pop()
+            if stack:
+                stack[-1]["peak"] = max(stack[-1]["peak"], record["peak"])
+            with self.lock:
+                self.records.append(record)
+
+    def phases(self):
+        with self.lock:
+            records = sorted(self.records, key=lambda record: record["start"])
+        return [{
+            "name": record["name"],
+            "depth": record["depth"],
+            "start": record["start"],
+            "wall": record["wall"],
+            "cpu": record["cpu"],
+            "peak_mb": record["peak"] / 1e6,
+            "elliptic": record["elliptic"],
+        } for record in records]
+
+    def report(self):
+        # {"phases": [...] in order, "totals": {name: sums}, "counters": {...}}
+        with self.lock:
+            counters = dict(self.counters)
+        return {"phases": self.phases(), "totals": self.totals(), "counters": counters}
+
+    def totals(self, since=0.0):
+        # per phase name sums over the phases started after since
+        totals = collections.OrderedDict()
+        for record in self.phases():
+            if record["start"] < since:
+                continue
+            total = totals.setdefault(record["name"],
+                {"calls": 0, "wall": 0.0, "cpu": 0.0, "peak_mb": 0.0, "elliptic": 0})
+            total["calls"] += 1
+            total["wall"] += record["wall"]
+            total["cpu"] += record["cpu"]
+            total["peak_mb"] = max(total["peak_mb"], record["peak_mb"])
+            total["elliptic"] += record["elliptic"]
+        return totals
+
+    def summary(self, names=None, since=0.0):
+        # one line for a status bar, e.g. "field 1.20 s (4.1E+06 K/E) 96 MB, plot 0.35 s 12 MB"
+        parts = []
+        for name, total in self.totals(since).items():
+            if names is not None and name not in names:
+                continue
+            part = "{} {:.2f} s".format(name, total["wall"])
+            if total["elliptic"]:
+                part += " ({:.1E} K/E)".format(total["elliptic"])
+            if total["peak_mb"]:
+                part += " {:.0f} MB".format(total["peak_mb"])
+            parts.append(part)
+        return ", ".join(parts)
+
+    def write(self, filename):
+        with open(filename, "w") as f:
+            json.dump(self.report(), f, indent=1)
+
+
+profiler = Profiler()
+
+
+def enable_from_environment(variable="MFV_PROFILE"):
+    # MFV_PROFILE=report.json enables the profiler and writes its report at exit
+    filename = os.environ.get(variable)
+    if not filename:
+        return False
+    profiler.enable()
+    atexit.register(profiler.write, filename)
+    return True
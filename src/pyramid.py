@@ -0,0 +1,72 @@
+import numpy
+
+# Multi-resolution copies of a grid [z, y] for drawing. Level 0 is the grid
+# itself and every next level halves both sizes, averaging blocks of 2 x 2
+# points (or keeping one point of each block, for grids like the binary
+# homogeneity map that must not be blended, along with its coordinates so that
+# every kept point stays where it was). An odd last row or column is dropped,
+# so the points of every level stay evenly spaced.
+
+
+def downsample(values, average=True):
+    nz, ny = values.shape[0] // 2 * 2, values.shape[1] // 2 * 2
+    values = values[:nz, :ny]
+    if not average:
+        return values[::2, ::2].copy()
+    return 0.25 * (values[0::2, 0::2] + values[1::2, 0::2] + values[0::2, 1::2] + values[1::2, 1::2])
+
+
+def downsample_axis(arr, average=True):
+    n = len(arr) // 2 * 2
+    if not average:
+        return arr[0:n:2].copy()
+    return 0.5 * (arr[0:n:2] + arr[1:n:2])
+
+
+def uniform(arr, rtol=1e-6):
+    step = numpy.diff(arr)
+    return len(arr) > 1 and numpy.allclose(step, step[0], rtol=rtol, atol=0)
+
+
+class GridPyramid(object):
+    def __init__(self, values, z_arr, y_arr, average=True, smallest=2):
+        self.values = values
+        self.levels = [(numpy.asarray(values), numpy.asarray(z_arr, dtype=float), numpy.asarray(y_arr, dtype=float))]
+        self.uniform = uniform(self.levels[0][1]) and uniform(self.levels[0][2])
+        while min(self.levels[-1][0].shape) >= 2 * smallest:
+            grid, z, y = self.levels[-1]
+            self.levels.append((downsample(grid, average), downsample_axis(z, average), downsample_axis(y, average)))
+
+    def window(self, k, z_lims, y_lims):
+        # index ranges of level k covering the window, one point beyond each side
+        _, z, y = self.levels[k]
+        i0 = max(numpy.searchsorted(z, min(z_lims), "right") - 1, 0)
+        i1 = min(numpy.searchsorted(z, max(z_lims), "left") + 1, len(z))
+        j0 = max(numpy.searchsorted(y, min(y_lims), "right") - 1, 0)
+        j1 = min(numpy.searchsorted(y, max(y_lims), "left") + 1, len(y))
+        return i0, i1, j0, j1
+
+    def select(self, z_lims, y_lims, width, height):
+        # the level closest to one point per pixel of a width x height view
+        # of the window, i.e. with 0.7 to 1.4 points per pixel
+        i0, i1, j0, j1 = self.window(0, z_lims, y_lims)
+        ratio = min((i1 - i0) / max(width, 1), (j1 - j0) / max(height, 1))
+        if ratio < numpy.sqrt(2):
+            return 0
+        return min(int(numpy.log2(ratio) + 0.5), len(self.levels) - 1)
+
+    def get(self, z_lims, y_lims, width, height):
+        # (values, z, y) of the selected level, cut to the window
+        k = self.select(z_lims, y_lims, width, height)
+        grid, z, y = self.levels[k]
+        i0, i1, j0, j1 = self.window(k, z_lims, y_lims)
+        return grid[i0:i1, j0:j1], z[i0:i1], y[j0:j1]
+
+    def image(self, z_lims, y_lims, width, height):
+        # values and extent for imshow(values.T, origin="lower", extent=extent),
+        # with every point at the center of its pixel
+        values, z, y = self.get(z_lims, y_lims, width, height)
+        dz = (z[-1] - z[0]) / (len(z) - 1) if len(z) > 1 else 0.0
+        dy = (y[-1] - y[0]) / (len(y) - 1) if len(y) > 1 else 0.0
+        extent = (z[0] - 0.5 * dz, z[-1] + 0.5 * dz, y[0] - 0.5 * dy, y[-1] + 0.5 * dy)
+        return values, extent
@@ -0,0 +1,162 @@
+import json
+import zlib
+
+import numpy
+
+from coil import CreateCoil
+
+# Binary result files (.mfv): the coils, the grid and the field grids of a
+# simulation, written as
+#
+#     magic (8 bytes) | header length (uint64, little endian) | JSON header | arrays
+#
+# with every array starting at a multiple of ALIGN bytes from the start of the
+# file. The header gives the dtype, shape and offset of each array. Raw arrays
+# are opened with numpy.memmap, so loading does not read the grids at all;
+# compressed arrays are stored as zlib blocks of chunk_rows rows each, inflated
+# only when their rows are first accessed.
+
+MAGIC = b"MFVRES1\0"
+ALIGN = 64
+ARRAYS = ["z_arr", "y_arr", "Bz_grid", "Brho_grid", "norm"]
+
+
+def aligned(offset):
+    return (offset + ALIGN - 1) // ALIGN * ALIGN
+
+
+def to_json(value):
+    # numpy scalars (e.g. in the electrical values) as plain numbers
+    if isinstance(value, numpy.generic):
+        return value.item()
+    raise TypeError("{!r} is not JSON serializable".format(value))
+
+
+class ChunkedArray(object):
+    # read-only view of a compressed array, indexed like an ndarray
+    def __init__(self, filename, dtype, shape, chunks, chunk_rows):
+        self.filename = filename
+        self.dtype = numpy.dtype(dtype)
+        self.shape = tuple(shape)
+        self.ndim = len(self.shape)
+        self.chunks = chunks
+        self.chunk_rows = chunk_rows
+        self.cache = {}
+
+    def __len__(self):
+        return self.shape[0]
+
+    def chunk(self, k):
+        if k not in self.cache:
+            offset, length = self.chunks[k]
+            with open(self.filename, "rb") as f:
+                f.seek(offset)
+                data = zlib.decompress(f.read(length))
+            rows = min(self.chunk_rows, self.shape[0] - k * self.chunk_rows)
+            self.cache[k] = numpy.frombuffer(data, dtype=self.dtype).reshape((rows,) + self.shape[1:])
+        return self.cache[k]
+
+    def rows(self, start, stop):
+        # rows start:stop, inflating only the chunks they fall in
+        if start >= stop:
+            return numpy.empty((0,) + self.shape[1:], dtype=self.dtype)
+        first = start // self.chunk_rows
+        last = (stop - 1) // self.chunk_rows
+        block = numpy.concatenate([self.chunk(k) for k in range(first, last + 1)])
+        return block[start - first * self.chunk_rows:stop - first * self.chunk_rows]
+
+    def __getitem__(self, key):
+        head = key[0] if isinstance(key, tuple) else key
+        rest = key[1:] if isinstance(key, tuple) else ()
+        if isinstance(head, (int, numpy.integer)):
+            i = range(self.shape[0])[head]
+            return self.rows(i, i + 1)[(0,) + rest]
+        if isinstance(head, slice):
+            start, stop, step = head.indices(self.shape[0])
+            if step > 0:
+                return self.rows(start, stop)[(slice(None, None, step),) + rest]
+        return numpy.asarray(self)[key]
+
+    def __array__(self, dtype=None, copy=None):
+        array = self.rows(0, self.shape[0])
+        return array if dtype is None else array.astype(dtype)
+
+
+def write_results_file(filename, coils, grid, z_arr, y_arr, Bz_grid, Brho_grid, norm,
+                       electrical_values=None, compress=False, chunk_rows=64, level=6):
+    arrays = dict(zip(ARRAYS, [numpy.ascontiguousarray(a) for a in (z_arr, y_arr, Bz_grid, Brho_grid, norm)]))
+
+    # compressed blocks are built first, their sizes go into the header
+    blocks = {}
+    for name, array in arrays.items():
+        if compress and array.ndim == 2:
+            blocks[name] = [zlib.compress(array[k:k + chunk_rows].tobytes(), level)
+                            for k in range(0, max(len(array), 1), chunk_rows)]
+        else:
+            blocks[name] = [array.tobytes()]
+
+    # offsets are relative to the data section, which starts after the header
+    entries = {}
+    offset = 0
+    for name, array in arrays.items():
+        offset = aligned(offset)
+        entry = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        if compress and array.ndim == 2:
+            entry["compression"] = "zlib"
+            entry["chunk_rows"] = chunk_rows
+            entry["chunks"] = [len(block) for block in blocks[name]]
+        entries[name] = entry
+        offset += sum(len(block) for block in blocks[name])
+
+    header = json.dumps({
+        "coils": [[coil.radius, coil.num_turns, coil.I, coil.pos_z] for coil in coils],
+        "grid": grid,
+        "electrical": electrical_values,
+        "arrays": entries,
+    }, default=to_json).encode("utf-8")
+    start = aligned(len(MAGIC) + 8 + len(header))
+
+    with open(filename, "wb") as f:
+        f.write(MAGIC)
+        f.write(numpy.uint64(len(header)).astype("<u8").tobytes())
+        f.write(header)
+        for name in ARRAYS:
+            f.write(b"\0" * (start + entries[name]["offset"] - f.tell()))
+            for block in blocks[name]:
+                f.write(block)
+
+
+def read_header(filename):
+    # (header, offset of the data section)
+    with open(filename, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError("{} is not a result file".format(filename))
+        length = int(numpy.frombuffer(f.read(8), dtype="<u8")[0])
+        header = json.loads(f.read(length).decode("utf-8"))
+    return header, aligned(len(MAGIC) + 8 + length)
+
+
+def read_results_file(filename):
+    # dict with coils, grid, electrical values and the arrays named in ARRAYS;
+    # raw arrays are read-only views of a memmap, compressed ones ChunkedArray
+    header, start = read_header(filename)
+    data = {
+        "coils": [CreateCoil("Circular", radius, int(turns), current, position)
+                  for radius, turns, current, position in header["coils"]],
+        "grid": header["grid"],
+        "electrical": header["electrical"],
+    }
+    for name, entry in header["arrays"].items():
+        offset = start + entry["offset"]
+        shape = tuple(entry["shape"])
+        if entry.get("compression") == "zlib":
+            chunks = []
+            for length in entry["chunks"]:
+                chunks.append((offset, length))
+                offset += length
+            data[name] = ChunkedArray(filename, entry["dtype"], shape, chunks, entry["chunk_rows"])
+        elif numpy.prod(shape) == 0:
+            data[name] = numpy.zeros(shape, dtype=entry["dtype"])
+        else:
+            data[name] = numpy.asarray(numpy.memmap(filename, dtype=entry["dtype"], mode="r", offset=offset, shape=shape))
+    return data
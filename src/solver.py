@@ -0,0 +1,177 @@
+import os
+import threading
+import timeit
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy
+
+from functions import field
+
+
+def split_tiles(z_points, y_points, tile_size, z_start=0, y_start=0):
+    tiles = []
+    for i in range(z_start, z_points, tile_size):
+        for j in range(y_start, y_points, tile_size):
+            tiles.append((slice(i, min(i + tile_size, z_points)),
+                          slice(j, min(j + tile_size, y_points))))
+    return tiles
+
+
+def is_mirrored(arr, center, tol=1e-9):
+    # True if arr, read backwards, is arr reflected about center
+    if len(arr) < 2:
+        return False
+    span = arr[-1] - arr[0]
+    return numpy.allclose(arr - center, center - arr[::-1], rtol=0.0, atol=tol * abs(span))
+
+
+def symmetry_center(coils, decimals=12):
+    # z about which the coil set is mirror-symmetric, or None. A coil at z_c + d
+    # needs a twin at z_c - d with the same radius, turns and current.
+    center = numpy.mean([coil.pos_z for coil in coils])
+    coils_keys = sorted(
+        tuple(numpy.round([coil.pos_z - center, coil.radius, coil.num_turns, coil.I], decimals))
+        for coil in coils)
+    mirror_keys = sorted(
+        tuple(numpy.round([center - coil.pos_z, coil.radius, coil.num_turns, coil.I], decimals))
+        for coil in coils)
+    if coils_keys == mirror_keys:
+        return center
+    return None
+
+
+def detect_symmetry(coils, z_arr, y_arr):
+    # The field only depends on |y|, so a grid symmetric about y = 0 is always
+    # mirrored. Mirroring in z needs both the coils and the grid to be symmetric
+    # about the same plane, across which Bz is even and Brho is odd.
+    y_mirror = is_mirrored(y_arr, 0.0)
+    center = symmetry_center(coils)
+    z_mirror = center is not None and is_mirrored(z_arr, center)
+    return z_mirror, y_mirror
+
+
+def mirror_y(Bz_grid, Brho_grid, y_start, z_start=0):
+    # columns below y_start are copied from their mirror image about y = 0
+    z_points, y_points = Bz_grid.shape
+    if y_start:
+        computed = slice(y_points - y_start, y_points)
+        rows = slice(z_start, z_points)
+        Bz_grid[rows, :y_start] = Bz_grid[rows, computed][:, ::-1]
+        Brho_grid[rows, :y_start] = Brho_grid[rows, computed][:, ::-1]
+
+
+def mirror_z(Bz_grid, Brho_grid, z_start):
+    # rows below z_start are copied from their mirror image about the
+    # symmetry plane, Bz is even and Brho odd across it
+    z_points, y_points = Bz_grid.shape
+    if z_start:
+        computed = slice(z_points - z_start, z_points)
+        Bz_grid[:z_start] = Bz_grid[computed][::-1]
+        Brho_grid[:z_start] = -Brho_grid[computed][::-1]
+
+
+class ThroughputMeter(object):
+    # exponentially weighted points-per-second estimate, constant memory
+    def __init__(self, total, smoothing=0.3):
+        self.total = total
+        self.smoothing = smoothing
+        self.rate = None
+        self.last_count = 0
+        self.last_time = timeit.default_timer()
+
+    def update(self, count):
+        now = timeit.default_timer()
+        elapsed = now - self.last_time
+        if count > self.last_count and elapsed > 0:
+            rate = (count - self.last_count) / elapsed
+            if self.rate is None:
+                self.rate = rate
+            else:
+                self.rate = self.smoothing * rate + (1.0 - self.smoothing) * self.rate
+            self.last_count = count
+            self.last_time = now
+
+    def eta(self):
+        if not self.rate:
+            return None
+        return (self.total - self.last_count) / self.rate
+
+
+class TiledSolver(object):
+    # NumPy and scipy.special release the GIL inside their loops, so worker
+    # threads scale over cores while writing straight into the shared result
+    # arrays. Every point sees the same element-wise operations whatever the
+    # tiling, so the result is bit-for-bit equal to the serial run.
+    def __init__(self, coils, z_arr, y_arr, mu0, workers=None, tile_size=64, symmetry=True):
+        self.coils = coils
+        self.z_arr = numpy.asarray(z_arr, dtype=float)
+        self.y_arr = numpy.asarray(y_arr, dtype=float)
+        self.mu0 = mu0
+        self.workers = workers if workers else (os.cpu_count() or 1)
+        self.tile_size = tile_size
+
+        self.Bz_grid = numpy.zeros(shape=(len(self.z_arr), len(self.y_arr)))
+        self.Brho_grid = numpy.zeros(shape=(len(self.z_arr), len(self.y_arr)))
+
+        # only the unique quadrant is computed, the rest is mirrored afterwards
+        z_points, y_points = len(self.z_arr), len(self.y_arr)
+        self.z_mirror, self.y_mirror = False, False
+        if symmetry:
+            self.z_mirror, self.y_mirror = detect_symmetry(self.coils, self.z_arr, self.y_arr)
+        self.z_start = z_points // 2 if self.z_mirror else 0
+        self.y_start = y_points // 2 if self.y_mirror else 0
+
+        self.tiles = split_tiles(z_points, y_points, self.tile_size, self.z_start, self.y_start)
+        self.total = (z_points - self.z_start) * (y_points - self.y_start)
+        self.count = 0
+        self.stop = False
+        self.lock = threading.Lock()
+
+    def cancel(self):
+        self.stop = True
+
+    def compute_tile(self, tile):
+        # returns the number of field evaluations done
+        rows, cols = tile
+        z = self.z_arr[rows, None]
+        rho = numpy.abs(self.y_arr[cols])[None, :]
+        self.Bz_grid[rows, cols], self.Brho_grid[rows, cols] = field(self.coils, rho, z, self.mu0)
+        return (rows.stop - rows.start) * (cols.stop - cols.start)
+
+    def run_tile(self, tile, on_tile):
+        # cancellation is checked between tiles, so it takes effect within one tile
+        if self.stop:
+            return
+
+        start = timeit.default_timer()
+        points = self.compute_tile(tile)
+        elapsed = timeit.default_timer() - start
+
+        with self.lock:
+            self.count += points
+        if on_tile:
+            on_tile(points, elapsed)
+
+    def mirror(self):
+        mirror_y(self.Bz_grid, self.Brho_grid, self.y_start, self.z_start)
+        mirror_z(self.Bz_grid, self.Brho_grid, self.z_start)
+
+    def finish(self):
+        self.mirror()
+
+    def run(self, on_tile=None):
+        # returns True when every tile was computed, False if it was cancelled
+        if self.workers == 1:
+            for tile in self.tiles:
+                self.run_tile(tile, on_tile)
+        else:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                futures = [pool.submit(self.run_tile, tile, on_tile) for tile in self.tiles]
+                for future in futures:
+                    future.result()
+
+        if self.stop or self.count != self.total:
+            return False
+
+        self.finish()
+        return True
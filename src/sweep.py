@@ -0,0 +1,255 @@
+import sys
+
+is_frozen = getattr(sys, 'frozen', False)
+frozen_temp_path = getattr(sys, '_MEIPASS', '')
+
+import os
+
+# This is needed to find resources when using pyinstaller
+if is_frozen:
+    basedir = frozen_temp_path
+else:
+    basedir = os.path.dirname(os.path.abspath(__file__))
+resource_dir = os.path.join(basedir, 'resources')
+
+
+
+# Parameter sweeps over a base coil set, run in a process pool. Each finished
+# run appends one JSON line with its summary to the output file, so the file
+# can be followed while the sweep runs, and a sweep started again with the
+# same output skips the runs already in it. Every line carries the key of its
+# sweep, a hash of the base coils, the grid, the parameters and their values
+# and the level, so an output written by a different sweep is refused rather
+# than mixed with, and its runs are never mistaken for done. A run that fails
+# is written as a line with an "error" instead of the summary, and is run
+# again next time.
+#
+#     python sweep.py params.xlsx summary.jsonl separation=0.05:0.15:11 current[1]=0.5:1.5:5
+#
+# A parameter is a coil attribute (radius, turns, current or position), for
+# one coil with [i] or for every coil, or "separation", the distance between
+# the outermost coils with the positions scaled about their mean. Values are
+# start:stop:num (inclusive, as numpy.linspace) or a comma separated list.
+
+import argparse
+import hashlib
+import itertools
+import json
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy
+
+from coil import CircularCoil
+from fieldcache import CachedSolver
+from functions import MU0, compute_norm
+from homogeneity import UniformityIndex
+from workbook import read_params
+import wires
+
+ATTRIBUTES = {"radius": "radius", "turns": "num_turns", "current": "I", "position": "pos_z"}
+
+SPEC = re.compile(r"^(\w+)(?:\[(\d+)\])?=(.+)$")
+
+
+def parse_spec(text):
+    # "current[1]=0.5:1.5:5" -> ("current", 1, array of values)
+    match = SPEC.match(text.replace(" ", ""))
+    if not match:
+        raise ValueError("invalid parameter '{}'".format(text))
+    name, index, values = match.groups()
+    if name not in ATTRIBUTES and name != "separation":
+        raise ValueError("unknown parameter '{}'".format(name))
+
+    if ":" in values:
+        start, stop, num = values.split(":")
+        values = numpy.linspace(float(start), float(stop), int(num))
+    else:
+        values = numpy.array([float(value) for value in values.split(",")])
+    return name, None if index is None else int(index), values
+
+
+def spec_label(name, index):
+    return name if index is None else "{}[{}]".format(name, index)
+
+
+def sweep_key(coils, grid, specs, level):
+    # identifies the set of runs; the run ids are only indices into it
+    data = {
+        "coils": [[coil.radius, coil.num_turns, coil.I, coil.pos_z] for coil in coils],
+        "grid": grid,
+        "specs": [[name, index, [float(value) for value in values]] for name, index, values in specs],
+        "level": level,
+    }
+    text = json.dumps(data, sort_keys=True, default=float)
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+
+def expand(specs):
+    # (run id, {label: value}) for every combination of values
+    runs = []
+    for indices in itertools.product(*[range(len(values)) for _, _, values in specs]):
+        assignment = {spec_label(name, index): float(values[i])
+                      for (name, index, values), i in zip(specs, indices)}
+        runs.append(("-".join(str(i) for i in indices), assignment))
+    return runs
+
+
+def apply(coils, specs, assignment):
+    # copy of coils with the assignment applied, in the order of specs
+    coils = [CircularCoil(coil.radius, coil.num_turns, coil.I, coil.pos_z) for coil in coils]
+    for name, index, _ in specs:
+        value = assignment[spec_label(name, index)]
+        if name == "separation":
+            positions = numpy.array([coil.pos_z for coil in coils])
+            span = positions.max() - positions.min()
+            mean = positions.mean()
+            for coil in coils:
+                coil.pos_z = mean + (coil.pos_z - mean) * (value / span if span else 0.0)
+            continue
+        targets = coils if index is None else [coils[index]]
+        for coil in targets:
+            setattr(coil, ATTRIBUTES[name], int(round(value)) if name == "turns" else value)
+    return coils
+
+
+def run(key, run_id, assignment, coils, grid, level, grids_dir=None):
+    # the summary of one run; per-coil fields stay cached in the worker process
+    z_arr = numpy.linspace(grid["z_min"], grid["z_max"], grid["z_points"] + 1)
+    y_arr = numpy.linspace(grid["y_min"], grid["y_max"], grid["y_points"] + 1)
+    solver = CachedSolver(coils, z_arr, y_arr, MU0, workers=1)
+    solver.run()
+    norm = numpy.sqrt(solver.Bz_grid**2 + solver.Brho_grid**2)
+
+    zmid = (grid["z_min"] + grid["z_max"]) * 0.5
+    ymid = (grid["y_min"] + grid["y_max"]) * 0.5
+    index = UniformityIndex(coils, norm, MU0, (zmid, ymid), z_arr, y_arr)
+    cylinder = index.cylinder(level)
+
+    # the wire for the largest current, which also carries the others
+    table = wires.load(resource_dir + "/awg.dat")
+    current = max(abs(coil.I) for coil in coils)
+
+    if grids_dir:
+        numpy.savez_compressed(os.path.join(grids_dir, "{}-{}.npz".format(key, run_id)),
+            z_arr=z_arr, y_arr=y_arr, Bz_grid=solver.Bz_grid, Brho_grid=solver.Brho_grid, norm=norm)
+
+    return {
+        "sweep": key,
+        "run": run_id,
+        "params": assignment,
+        "coils": [[coil.radius, coil.num_turns, coil.I, coil.pos_z] for coil in coils],
+        "center_field": float(compute_norm(coils, abs(ymid), zmid, MU0)),
+        "level": level,
+        "homogeneous_volume": float(index.region_volume(level)),
+        "cylinder_volume": float(numpy.pi * cylinder[2]**2 * (cylinder[1] - cylinder[0])) if cylinder else 0.0,
+        "awg_gauge": int(table.gauge[table.index(current)]),
+        "wire_feasible": bool(table.feasible(current)),
+    }
+
+
+def completed(output, key):
+    # run ids of the sweep key already summarized in the output; a line cut
+    # short by a crash is ignored and failed runs are not done
+    done = set()
+    if os.path.exists(output):
+        with open(output) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    sweep_id, run_id = record.get("sweep"), record["run"]
+                except (ValueError, KeyError, AttributeError):
+                    continue
+                if sweep_id != key:
+                    raise ValueError("{} holds the runs of another sweep (different coils, grid, "
+                        "parameters or level), use a new output file".format(output))
+                if "error" not in record:
+                    done.add(run_id)
+    return done
+
+
+def truncate_partial(output):
+    # drops a last line left without its newline, so that appending starts clean
+    if not os.path.exists(output):
+        return
+    with open(output, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+
+
+def sweep(coils, grid, specs, output, workers=None, level=0.97, grids_dir=None, on_result=None):
+    # runs every combination not in output yet, returns the number of runs
+    # done and the number of them that failed
+    key = sweep_key(coils, grid, specs, level)
+    truncate_partial(output)
+    done = completed(output, key)
+    runs = [(run_id, assignment) for run_id, assignment in expand(specs) if run_id not in done]
+    if grids_dir:
+        os.makedirs(grids_dir, exist_ok=True)
+
+    failed = 0
+    workers = workers if workers else (os.cpu_count() or 1)
+    with open(output, "a") as f, ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run, key, run_id, assignment, apply(coils, specs, assignment), grid, level, grids_dir):
+                   (run_id, assignment) for run_id, assignment in runs}
+        for future in as_completed(futures):
+            # a failed run is recorded and the others are still collected
+            try:
+                result = future.result()
+            except Exception as e:
+                run_id, assignment = futures[future]
+                result = {"sweep": key, "run": run_id, "params": assignment,
+                          "error": "{}: {}".format(type(e).__name__, e)}
+                failed += 1
+            f.write(json.dumps(result) + "\n")
+            f.flush()
+            if on_result:
+                on_result(result)
+    return len(runs), failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep coil parameters without the GUI.")
+    parser.add_argument("params", help="parameters workbook (.xlsx) with the base coils and grid")
+    parser.add_argument("output", help="summary file, one JSON line per run")
+    parser.add_argument("specs", nargs="+", metavar="param=start:stop:num",
+        help="e.g. separation=0.05:0.15:11, current[1]=0.5:1.5:5 or turns=100,200,400")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--level", type=float, default=97.0, help="homogeneity level [%%]")
+    parser.add_argument("--grids", default=None, metavar="DIR", help="also save the full grids of every run")
+    args = parser.parse_args(argv)
+
+    coils, grid = read_params(args.params)
+    try:
+        specs = [parse_spec(text) for text in args.specs]
+    except ValueError as e:
+        parser.error(str(e))
+    for name, index, _ in specs:
+        if index is not None and index >= len(coils):
+            parser.error("{} has no coil {}".format(args.params, index))
+
+    key = sweep_key(coils, grid, specs, args.level / 100)
+    run_ids = set(run_id for run_id, _ in expand(specs))
+    total = len(run_ids)
+    try:
+        count = [len(completed(args.output, key) & run_ids)]
+    except ValueError as e:
+        parser.error(str(e))
+
+    def on_result(result):
+        if "error" in result:
+            print("[failed] {} {}: {}".format(result["run"], json.dumps(result["params"]), result["error"]))
+            return
+        count[0] += 1
+        print("[{}/{}] {} {}".format(count[0], total, result["run"], json.dumps(result["params"])))
+
+    _, failed = sweep(coils, grid, specs, args.output, args.workers, args.level / 100, args.grids, on_result)
+    print("Summaries written to {}".format(args.output))
+    if failed:
+        print("{} runs failed, running the same command again retries them".format(failed))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+import numpy
+
+# AWG wire table (resources/awg.dat): one row per gauge, thickest first, with
+# the diameter [mm], cross sectional area [mm2], resistance [Ohm/km] and
+# nominal current [A]. The nominal currents decrease with the gauge, so the
+# wire for a current is found by binary search: the thinnest gauge whose
+# nominal current is above it. A current above every nominal current gets the
+# thickest wire and is reported as not feasible.
+
+TABLES = {}
+
+
+class WireTable(object):
+    def __init__(self, filename):
+        self.gauge, self.diameter, self.section, self.resist, self.nominal = numpy.loadtxt(filename, unpack=True)
+        self.gauge = self.gauge.astype(int)
+        self.ascending = self.nominal[::-1]
+
+    def __len__(self):
+        return len(self.gauge)
+
+    def index(self, current):
+        # row of the wire for each current (scalar or array)
+        above = len(self) - numpy.searchsorted(self.ascending, numpy.abs(current), "right")
+        return numpy.clip(above - 1, 0, len(self) - 1)
+
+    def feasible(self, current):
+        return numpy.abs(current) < self.nominal[0]
+
+    def select(self, currents, axis=-1):
+        # rows for sets of coils sharing one wire, sized by their largest
+        # current along axis, e.g. a (designs, coils) array of currents
+        return self.index(numpy.abs(currents).max(axis=axis))
+
+
+def load(filename):
+    # parsed once per file
+    if filename not in TABLES:
+        TABLES[filename] = WireTable(filename)
+    return TABLES[filename]
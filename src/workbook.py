@@ -0,0 +1,165 @@
+import numpy
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+
+from coil import CreateCoil
+
+# Layout of the "Simulation parameters" sheet: one (label, key) pair per row.
+# The number of points is stored as in the input window, i.e. the number of
+# intervals (the simulation grids have one more point).
+GRID_ROWS = [
+    ("Min. z [m]", "z_min"),
+    ("Max. z [m]", "z_max"),
+    ("Points z", "z_points"),
+    ("Min. y [m]", "y_min"),
+    ("Max. y [m]", "y_max"),
+    ("Points y", "y_points"),
+]
+
+COIL_COLUMNS = ["Radius [m]", "Num. turns", "Current [A]", "Pos. Z [m]"]
+
+ELECTRICAL_ROWS = [
+    "AWG Gauge",
+    "Wire diameter [mm]",
+    "Wire cross sectional area [mm2]",
+    "Nominal current [A]",
+    "Maximum current [A]",
+    "Total wire length [m]",
+    "Wire resistance [Ohm]",
+]
+
+
+def title(sheet, value, title_style):
+    # header cell of a write-only sheet
+    cell = WriteOnlyCell(sheet, value=value)
+    cell.font = title_style
+    return cell
+
+
+def read_grid(wInput):
+    grid = {}
+    rows = wInput.iter_rows(max_col=2, values_only=True)
+    for (label, key), row in zip(GRID_ROWS, rows):
+        grid[key] = row[1]
+    grid["z_points"] = int(grid["z_points"])
+    grid["y_points"] = int(grid["y_points"])
+    return grid
+
+
+def read_coils(wCoils):
+    coils = []
+    for radius, turns, current, position in wCoils.iter_rows(min_row=2, max_col=4, values_only=True):
+        if radius is None:
+            continue
+        coils.append(CreateCoil("Circular", radius, int(turns), current, position))
+    return coils
+
+
+def read_electrical(wElectrical):
+    return {label: value for label, value in wElectrical.iter_rows(max_col=2, values_only=True)
+            if label is not None}
+
+
+def read_params(filename):
+    wb = openpyxl.load_workbook(filename, read_only=True)
+    grid = read_grid(wb["Simulation parameters"])
+    coils = read_coils(wb['Input parameters'])
+    wb.close()
+    return coils, grid
+
+
+def read_field(sheet, nz, ny):
+    # z_arr, y_arr and the grid [z, y] of a field sheet: z along the first
+    # row, y down the first column
+    rows = sheet.iter_rows(values_only=True)
+    z_arr = numpy.array(next(rows)[1:nz + 1], dtype=float)
+    y_arr = numpy.empty(ny)
+    values = numpy.empty((nz, ny))
+    j = 0
+    for row in rows:
+        if row[0] is None:
+            continue
+        if j == ny:
+            raise ValueError("sheet '{}' has more than {} rows".format(sheet.title, ny))
+        y_arr[j] = row[0]
+        values[:, j] = row[1:nz + 1]
+        j += 1
+    if j < ny:
+        raise ValueError("sheet '{}' has {} rows instead of {}".format(sheet.title, j, ny))
+    return z_arr, y_arr, values
+
+
+def read_results(filename):
+    # the contents of a results workbook, as returned by resultfile.read_results_file
+    wb = openpyxl.load_workbook(filename, read_only=True)
+    grid = read_grid(wb["Simulation parameters"])
+    nz = grid["z_points"] + 1
+    ny = grid["y_points"] + 1
+    z_arr, y_arr, Bz_grid = read_field(wb['B z'], nz, ny)
+    _, _, Brho_grid = read_field(wb['B y'], nz, ny)
+    _, _, norm = read_field(wb['B norm'], nz, ny)
+    data = {
+        "coils": read_coils(wb['Input parameters']),
+        "grid": grid,
+        "electrical": read_electrical(wb['Electrical parameters']) if 'Electrical parameters' in wb.sheetnames else None,
+        "z_arr": z_arr,
+        "y_arr": y_arr,
+        "Bz_grid": Bz_grid,
+        "Brho_grid": Brho_grid,
+        "norm": norm,
+    }
+    wb.close()
+    return data
+
+
+def write_grid(wInput, grid, title_style):
+    for label, key in GRID_ROWS:
+        wInput.append([title(wInput, label, title_style), grid[key]])
+
+
+def write_coils(wCoils, coils, title_style):
+    wCoils.append([title(wCoils, label, title_style) for label in COIL_COLUMNS])
+    for coil in coils:
+        wCoils.append([coil.radius, coil.num_turns, coil.I, coil.pos_z])
+
+
+def write_params(filename, coils, grid):
+    # the sheets read by read_params, i.e. "Load parameters"
+    wb = openpyxl.Workbook(write_only=True)
+    title_style = Font(bold=True)
+    write_grid(wb.create_sheet('Simulation parameters'), grid, title_style)
+    write_coils(wb.create_sheet('Input parameters'), coils, title_style)
+    wb.save(filename)
+
+
+def write_field(sheet, z_arr, y_arr, values, title_style):
+    # one row per y, so the grid [z, y] is written transposed
+    sheet.append([None] + [title(sheet, float(z), title_style) for z in z_arr])
+    for j, y in enumerate(y_arr):
+        sheet.append([title(sheet, float(y), title_style)] + values[:, j].tolist())
+
+
+def write_results(filename, coils, grid, z_arr, y_arr, Bz_grid, Brho_grid, norm, electrical_values):
+    # rows are streamed to disk as they are appended (write-only mode)
+    wb = openpyxl.Workbook(write_only=True)
+
+    wInput = wb.create_sheet('Simulation parameters')
+    wCoils = wb.create_sheet('Input parameters')
+    wElectrical = wb.create_sheet('Electrical parameters')
+    wBy = wb.create_sheet('B y')
+    wBz = wb.create_sheet('B z')
+    wBnorm = wb.create_sheet('B norm')
+    title_style = Font(bold=True)
+
+    write_grid(wInput, grid, title_style)
+    write_coils(wCoils, coils, title_style)
+
+    for label in ELECTRICAL_ROWS:
+        wElectrical.append([title(wElectrical, label, title_style), electrical_values[label]])
+
+    write_field(wBy, z_arr, y_arr, numpy.asarray(Brho_grid), title_style)
+    write_field(wBz, z_arr, y_arr, numpy.asarray(Bz_grid), title_style)
+    write_field(wBnorm, z_arr, y_arr, numpy.asarray(norm), title_style)
+
+    wb.save(filename)
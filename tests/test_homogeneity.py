@@ -0,0 +1,29 @@
+import numpy
+
+import designs
+from fieldcache import CachedSolver, FieldCache
+from functions import MU0
+from homogeneity import UniformityIndex
+
+
+def uniformity_index(y_min, y_max):
+    coils = designs.helmholtz()
+    z_arr = numpy.linspace(-0.3, 0.3, 301)
+    y_arr = numpy.linspace(y_min, y_max, int(round((y_max - y_min) / 0.002)) + 1)
+    solver = CachedSolver(coils, z_arr, y_arr, MU0, workers=1, cache=FieldCache())
+    solver.run()
+    norm = numpy.sqrt(solver.Bz_grid**2 + solver.Brho_grid**2)
+    return UniformityIndex(coils, norm, MU0, (0.0, 0.0), z_arr, y_arr)
+
+
+def test_asymmetric_grids_match_the_symmetric_one():
+    symmetric = uniformity_index(-0.3, 0.3)
+    volume = symmetric.region_volume(0.99)
+    z_min, z_max, radius = symmetric.cylinder(0.99)
+    assert 3e-3 < volume < 4.5e-3
+    assert abs(radius - 0.074) < 0.004
+
+    for y_min, y_max in [(-0.3, 0.02), (-0.02, 0.3), (0.0, 0.3), (-0.3, 0.0)]:
+        index = uniformity_index(y_min, y_max)
+        assert numpy.isclose(index.region_volume(0.99), volume)
+        assert numpy.allclose(index.cylinder(0.99), (z_min, z_max, radius))
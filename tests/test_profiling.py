@@ -0,0 +1,30 @@
+import numpy
+
+import profiling
+from profiling import Profiler
+
+
+def run(profiler):
+    profiler.enable()
+    try:
+        with profiler.phase("outer"):
+            with profiler.phase("inner"):
+                numpy.ones(2 * 10**6).sum()
+            numpy.ones(10**6).sum()
+    finally:
+        profiler.disable()
+    return {record["name"]: record["peak_mb"] for record in profiler.phases()}
+
+
+def test_phase_peaks():
+    peaks = run(Profiler())
+    assert peaks["inner"] >= 16.0
+    assert peaks["outer"] >= peaks["inner"]
+
+
+def test_phase_peaks_without_reset_peak(monkeypatch):
+    # Python < 3.9
+    monkeypatch.delattr(profiling.tracemalloc, "reset_peak", raising=False)
+    peaks = run(Profiler())
+    assert peaks["inner"] >= 16.0
+    assert peaks["outer"] >= peaks["inner"]
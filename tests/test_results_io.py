@@ -0,0 +1,50 @@
+import numpy
+
+import designs
+from functions import MU0
+from resultfile import read_results_file, write_results_file
+from solver import TiledSolver
+from workbook import ELECTRICAL_ROWS, read_results, write_results
+
+
+def results():
+    coils = designs.maxwell()
+    z_arr = numpy.linspace(-0.4, 0.4, 23)
+    y_arr = numpy.linspace(-0.3, 0.3, 17)
+    solver = TiledSolver(coils, z_arr, y_arr, MU0)
+    solver.run()
+    norm = numpy.sqrt(solver.Bz_grid**2 + solver.Brho_grid**2)
+    grid = {"z_min": z_arr[0], "z_max": z_arr[-1], "z_points": len(z_arr) - 1,
+            "y_min": y_arr[0], "y_max": y_arr[-1], "y_points": len(y_arr) - 1}
+    electrical = {label: float(k + 1) for k, label in enumerate(ELECTRICAL_ROWS)}
+    return coils, grid, z_arr, y_arr, solver.Bz_grid, solver.Brho_grid, norm, electrical
+
+
+def check(data, coils, grid, z_arr, y_arr, Bz_grid, Brho_grid, norm, electrical, rtol=0.0):
+    def close(a, b):
+        return numpy.allclose(numpy.asarray(a, dtype=float), numpy.asarray(b, dtype=float), rtol=rtol, atol=0.0)
+
+    assert close([(c.radius, c.num_turns, c.I, c.pos_z) for c in data["coils"]],
+                 [(c.radius, c.num_turns, c.I, c.pos_z) for c in coils])
+    assert sorted(data["grid"]) == sorted(grid)
+    assert close([data["grid"][key] for key in grid], list(grid.values()))
+    assert data["electrical"] == electrical
+    for name, array in [("z_arr", z_arr), ("y_arr", y_arr), ("Bz_grid", Bz_grid),
+                        ("Brho_grid", Brho_grid), ("norm", norm)]:
+        assert close(data[name], array)
+
+
+def test_result_file_round_trip(tmp_path):
+    values = results()
+    for compress in [False, True]:
+        filename = str(tmp_path / "results.mfv")
+        write_results_file(filename, *values, compress=compress, chunk_rows=5)
+        check(read_results_file(filename), *values)
+
+
+def test_workbook_round_trip(tmp_path):
+    values = results()
+    filename = str(tmp_path / "results.xlsx")
+    write_results(filename, *values)
+    # openpyxl writes floats with 16 significant digits
+    check(read_results(filename), *values, rtol=1e-15)
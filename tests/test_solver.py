@@ -0,0 +1,63 @@
+import numpy
+
+import designs
+from fieldcache import CachedSolver, FieldCache
+from functions import MU0, field
+from solver import TiledSolver
+
+
+def direct(coils, z_arr, y_arr, mu0=MU0):
+    return field(coils, numpy.abs(y_arr)[None, :], z_arr[:, None], mu0)
+
+
+def grids():
+    # symmetric in y and z, and off-center, none of them on a winding
+    yield numpy.linspace(-0.4, 0.4, 83), numpy.linspace(-0.4, 0.4, 67)
+    yield numpy.linspace(-0.3, 0.5, 57), numpy.linspace(-0.1, 0.4, 44)
+
+
+def test_solvers_match_the_direct_field():
+    for name in ["helmholtz", "maxwell", "lee_whiting"]:
+        coils = designs.DESIGNS[name]()
+        for z_arr, y_arr in grids():
+            Bz, Brho = direct(coils, z_arr, y_arr)
+            # points on a coil plane are nudged by a float32 eps, by the
+            # cached solver for that coil only
+            scale = 1e-6 * numpy.abs(Bz).max()
+            for solver in [TiledSolver(coils, z_arr, y_arr, MU0, workers=2, tile_size=16),
+                           CachedSolver(coils, z_arr, y_arr, MU0, workers=2, tile_size=16, cache=FieldCache())]:
+                solver.run()
+                assert numpy.allclose(solver.Bz_grid, Bz, rtol=0.0, atol=scale)
+                assert numpy.allclose(solver.Brho_grid, Brho, rtol=0.0, atol=scale)
+
+
+def test_cached_solver_past_the_cache_budget():
+    z_arr, y_arr = numpy.linspace(-1.0, 1.0, 43), numpy.linspace(-1.0, 1.0, 43)
+    # some coils cached and some summed directly, and a symmetric set summed
+    # directly on the upper half of the rows
+    for coils, max_bytes in [(designs.random_coils(30, seed=1), 4 * 43 * 43 * 16), (designs.maxwell(), 1)]:
+        solver = CachedSolver(coils, z_arr, y_arr, MU0, workers=1, cache=FieldCache(max_bytes=max_bytes))
+        solver.run()
+        assert solver.direct
+        Bz, Brho = direct(coils, z_arr, y_arr)
+        scale = 1e-9 * numpy.abs(Bz).max()
+        assert numpy.allclose(solver.Bz_grid, Bz, rtol=0.0, atol=scale)
+        assert numpy.allclose(solver.Brho_grid, Brho, rtol=0.0, atol=scale)
+
+
+def test_cached_solver_mirrors_coils_on_the_center_plane():
+    coils = designs.maxwell()
+    z_arr, y_arr = numpy.linspace(-0.4, 0.4, 83), numpy.linspace(-0.4, 0.4, 67)
+    solver = CachedSolver(coils, z_arr, y_arr, MU0, workers=1, cache=FieldCache())
+    # the outer pair is one evaluation and a flip, the middle coil a half one
+    assert solver.total == (83 + 83 - 41) * (67 - 33)
+
+
+def test_cached_fields_depend_on_mu0():
+    coils = designs.helmholtz()
+    z_arr, y_arr = numpy.linspace(-0.3, 0.3, 33), numpy.linspace(-0.3, 0.3, 33)
+    cache = FieldCache()
+    for mu0 in [MU0, 2 * MU0]:
+        solver = CachedSolver(coils, z_arr, y_arr, mu0, workers=1, cache=cache)
+        solver.run()
+        assert numpy.allclose(solver.Bz_grid, direct(coils, z_arr, y_arr, mu0)[0])